@@ -0,0 +1,263 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+
+from job_queue import DurationEstimate, parse_language_limits
+
+# Admission control for executions: every run takes a ticket, which waits
+# until a slot is free under the global and per-language caps and the
+# caller's own concurrency. Waiting tickets are served in weighted fair
+# order across callers (a caller is a user id or a client address), so one
+# caller firing hundreds of runs only delays themselves.
+ADMISSION_ENABLED = os.getenv('ADMISSION_ENABLED', 'true').lower() == 'true'
+ADMISSION_MAX_CONCURRENT = int(os.getenv('ADMISSION_MAX_CONCURRENT', '32'))
+ADMISSION_MAX_QUEUED = int(os.getenv('ADMISSION_MAX_QUEUED', '1000'))
+ADMISSION_MAX_WAIT = float(os.getenv('ADMISSION_MAX_WAIT', '30'))
+
+# Per plan (see MONETIZATION.md), overridable with ADMISSION_<TIER>_<SETTING>:
+#   weight       share of execution slots relative to other waiting callers
+#   rate, burst  token bucket: runs per second sustained, and in a burst
+#   concurrency  runs executing at once for one caller
+#   queued       runs waiting at once for one caller
+# Requests without a valid token are 'anonymous', keyed by client address, so
+# everyone behind one address (NAT) shares that allowance.
+TIERS = {
+    'anonymous': {'weight': 1, 'rate': 0.5, 'burst': 10, 'concurrency': 2, 'queued': 10},
+    'free': {'weight': 2, 'rate': 1, 'burst': 20, 'concurrency': 2, 'queued': 20},
+    'pro': {'weight': 8, 'rate': 5, 'burst': 60, 'concurrency': 8, 'queued': 100},
+    'team': {'weight': 8, 'rate': 10, 'burst': 120, 'concurrency': 16, 'queued': 200},
+}
+
+
+def tier_settings(tiers=None):
+    tiers = tiers or TIERS
+    settings = {}
+    for name, defaults in tiers.items():
+        settings[name] = {
+            key: type(value)(os.getenv(f"ADMISSION_{name.upper()}_{key.upper()}", value))
+            for key, value in defaults.items()
+        }
+    return settings
+
+
+class Rejected(Exception):
+    """Not admitted; status is the HTTP status to answer with"""
+
+    def __init__(self, reason, message, retry_after, status=429):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = max(1, int(retry_after + 0.999))
+        self.status = status
+
+    def response(self):
+        return {"error": str(self), "reason": self.reason, "retry_after": self.retry_after}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self):
+        """Take a token, returns 0 or the seconds until one is available"""
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def full(self):
+        self._refill()
+        return self.tokens >= self.burst
+
+
+class Ticket:
+    def __init__(self, caller, tier, language, tag):
+        self.caller = caller
+        self.tier = tier
+        self.language = language
+        self.tag = tag
+        self.submitted = time.monotonic()
+        self.started = None
+        self.released = False
+        self.ready = threading.Event()
+        self.callbacks = []
+        # Filled in when the ticket has to wait
+        self.position = 0
+        self.estimated_wait_ms = 0
+
+    @property
+    def wait_ms(self):
+        return int(((self.started or time.monotonic()) - self.submitted) * 1000)
+
+
+class Scheduler:
+    """Token buckets, concurrency caps and weighted fair queueing.
+
+    Start-time fair queueing: a ticket's tag is its caller's previous tag
+    (or the current virtual time, if later) plus 1/weight, and the lowest
+    tag that fits under the caps runs next. Callers alternate, and a pro
+    caller gets about four slots to a free caller's one when both wait.
+    """
+
+    def __init__(self, max_concurrent=ADMISSION_MAX_CONCURRENT, max_queued=ADMISSION_MAX_QUEUED,
+                 language_limits=None, tiers=None):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.language_limits = (language_limits if language_limits is not None
+                                else parse_language_limits(os.getenv('ADMISSION_LANGUAGE_LIMITS', '')))
+        self.tiers = tiers or tier_settings()
+
+        self.lock = threading.Lock()
+        self.waiting = []
+        self.running = 0
+        self.running_by_language = defaultdict(int)
+        self.running_by_caller = defaultdict(int)
+        self.waiting_by_caller = defaultdict(int)
+        self.caller_tags = {}
+        self.virtual_time = 0.0
+        self.buckets = {}
+        self.estimate = DurationEstimate()
+
+    def settings(self, tier):
+        return self.tiers.get(tier) or self.tiers['free']
+
+    def language_limit(self, language):
+        return self.language_limits.get(language, self.max_concurrent)
+
+    def estimated_wait(self, ahead):
+        """Seconds until `ahead` earlier tickets have been let through"""
+        if self.running + ahead < self.max_concurrent:
+            return 0.0
+        return self.estimate.value * (ahead + 1) / self.max_concurrent
+
+    def submit(self, caller, tier, language):
+        """Queue a ticket (it may be admitted right away), raises Rejected"""
+        with self.lock:
+            settings = self.settings(tier)
+            if len(self.waiting) >= self.max_queued:
+                raise Rejected('queue_full', "Too many executions waiting, please retry later",
+                               self.estimated_wait(len(self.waiting)), status=503)
+            if self.waiting_by_caller[caller] >= settings['queued']:
+                raise Rejected('too_many_pending', "Too many of your executions are waiting, please retry later",
+                               self.estimated_wait(len(self.waiting)))
+
+            bucket = self.buckets.get(caller)
+            if bucket is None:
+                if len(self.buckets) > 10000:
+                    self.buckets = {key: b for key, b in self.buckets.items() if not b.full()}
+                bucket = self.buckets[caller] = TokenBucket(settings['rate'], settings['burst'])
+            retry_after = bucket.take()
+            if retry_after:
+                raise Rejected('rate_limited', "Rate limit exceeded, please retry later", retry_after)
+
+            if len(self.caller_tags) > 10000:
+                self.caller_tags = {key: t for key, t in self.caller_tags.items() if t > self.virtual_time}
+            tag = max(self.virtual_time, self.caller_tags.get(caller, 0.0)) + 1 / settings['weight']
+            self.caller_tags[caller] = tag
+            ticket = Ticket(caller, tier, language, tag)
+            self.waiting.append(ticket)
+            self.waiting_by_caller[caller] += 1
+            self._dispatch()
+
+            if ticket.started is None:
+                ticket.position = sum(1 for other in self.waiting if other.tag < tag)
+                ticket.estimated_wait_ms = int(self.estimated_wait(ticket.position) * 1000)
+            return ticket
+
+    def _eligible(self, ticket):
+        return (self.running_by_language[ticket.language] < self.language_limit(ticket.language)
+                and self.running_by_caller[ticket.caller] < self.settings(ticket.tier)['concurrency'])
+
+    def _dispatch(self):
+        while self.running < self.max_concurrent:
+            eligible = [ticket for ticket in self.waiting if self._eligible(ticket)]
+            if not eligible:
+                return
+            ticket = min(eligible, key=lambda t: t.tag)
+            self.waiting.remove(ticket)
+            self.waiting_by_caller[ticket.caller] -= 1
+            self.running += 1
+            self.running_by_language[ticket.language] += 1
+            self.running_by_caller[ticket.caller] += 1
+            self.virtual_time = max(self.virtual_time, ticket.tag)
+            ticket.started = time.monotonic()
+            ticket.ready.set()
+            for callback in ticket.callbacks:
+                callback()
+
+    def release(self, ticket):
+        """Give back the ticket's slot (or its place in the queue). Idempotent."""
+        with self.lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            caller = ticket.caller
+            if ticket.started is None:
+                self.waiting.remove(ticket)
+                self.waiting_by_caller[caller] -= 1
+            else:
+                self.running -= 1
+                self.running_by_language[ticket.language] -= 1
+                self.running_by_caller[caller] -= 1
+                self.estimate.record(time.monotonic() - ticket.started)
+
+            if not self.running_by_caller[caller] and not self.waiting_by_caller[caller]:
+                del self.running_by_caller[caller]
+                del self.waiting_by_caller[caller]
+                if self.caller_tags.get(caller, 0.0) <= self.virtual_time:
+                    self.caller_tags.pop(caller, None)
+            self._dispatch()
+
+    def _timed_out(self, ticket):
+        self.release(ticket)
+        with self.lock:
+            ahead = len(self.waiting)
+        return Rejected('wait_timeout', "Timed out waiting for an execution slot, please retry later",
+                        self.estimated_wait(ahead), status=503)
+
+    def wait(self, ticket, timeout=ADMISSION_MAX_WAIT):
+        """Block until the ticket is admitted, raises Rejected on timeout"""
+        if not ticket.ready.wait(timeout):
+            with self.lock:
+                started = ticket.started is not None
+            if not started:
+                raise self._timed_out(ticket)
+
+    async def wait_async(self, ticket, timeout=ADMISSION_MAX_WAIT):
+        """wait() for the event loop; no thread is held while waiting"""
+        loop = asyncio.get_running_loop()
+        ready = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: ready.done() or ready.set_result(None))
+
+        with self.lock:
+            if ticket.started is None:
+                ticket.callbacks.append(wake)
+            else:
+                ready.set_result(None)
+        try:
+            await asyncio.wait_for(ready, timeout)
+        except asyncio.TimeoutError:
+            with self.lock:
+                started = ticket.started is not None
+            if not started:
+                raise self._timed_out(ticket) from None
+
+    def stats(self):
+        with self.lock:
+            stats = {'all': {'running': self.running, 'waiting': len(self.waiting), 'callers': len(self.caller_tags)}}
+            for language, running in self.running_by_language.items():
+                stats[language] = {'running': running,
+                                   'waiting': sum(1 for t in self.waiting if t.language == language)}
+            return stats
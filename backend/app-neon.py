@@ -1,18 +1,25 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import psycopg2
-import docker
-import tempfile
 import os
 import time
 import uuid
 from datetime import datetime
 from functools import wraps
 import jwt as pyjwt
-import requests
+import atexit
+from db_pool import ConnectionPool, PoolTimeout, TimedCursor
+from jwks_cache import JWKSCache, TokenCache
+from pagination import InvalidCursor, decode_cursor, encode_cursor, page_headers, parse_limit
+from metrics import REGISTRY, instrument_app, language_label, observe_execution, set_pool_stats, track_in_flight
+from docker_client import pin_language_images, prefetch_images
+from executors import DockerExecutor, ExecutorRouter, LocalExecutor, SandboxExecutor, parse_isolation_policy
+from telemetry import execution_status
+from request_limits import limit_request_size, size_error
 
 app = Flask(__name__)
 CORS(app)
+instrument_app(app)
+limit_request_size(app)
 
 # Auth0 Configuration
 AUTH0_DOMAIN = os.getenv('AUTH0_DOMAIN')
@@ -21,26 +28,37 @@ AUTH0_AUDIENCE = os.getenv('AUTH0_AUDIENCE')
 # Neon Database Configuration
 DATABASE_URL = os.getenv('DATABASE_URL')
 
+# Process-wide pool: a fresh TLS handshake to Neon costs more than most queries
+db_pool = ConnectionPool(DATABASE_URL, cursor_factory=TimedCursor)
+atexit.register(db_pool.closeall)
+REGISTRY.add_collector(lambda: set_pool_stats('db', {'neon': db_pool.stats()}))
+
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+    """Check out a pooled connection, use as `with get_db_connection() as conn:`"""
+    return db_pool.connection()
+
+@app.errorhandler(PoolTimeout)
+def pool_exhausted(e):
+    response = jsonify({"error": "Database is busy, try again shortly"})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+# Signing keys are cached, AUTH0_JWKS_FILE points at a local JWKS for offline use
+jwks_cache = JWKSCache(
+    jwks_url=f'https://{AUTH0_DOMAIN}/.well-known/jwks.json',
+    jwks_file=os.getenv('AUTH0_JWKS_FILE')
+)
+token_cache = TokenCache()
 
 def verify_auth0_token(token):
     try:
-        jwks_url = f'https://{AUTH0_DOMAIN}/.well-known/jwks.json'
-        jwks = requests.get(jwks_url).json()
+        payload = token_cache.get(token)
+        if payload:
+            return payload
         
         unverified_header = pyjwt.get_unverified_header(token)
-        
-        rsa_key = {}
-        for key in jwks['keys']:
-            if key['kid'] == unverified_header['kid']:
-                rsa_key = {
-                    'kty': key['kty'],
-                    'kid': key['kid'],
-                    'use': key['use'],
-                    'n': key['n'],
-                    'e': key['e']
-                }
+        rsa_key = jwks_cache.get_key(unverified_header.get('kid'))
         
         if rsa_key:
             payload = pyjwt.decode(
@@ -50,6 +68,7 @@ def verify_auth0_token(token):
                 audience=AUTH0_AUDIENCE,
                 issuer=f'https://{AUTH0_DOMAIN}/'
             )
+            token_cache.put(token, payload)
             return payload
         
     except Exception as e:
@@ -80,94 +99,56 @@ def auth_required(f):
     
     return decorated
 
-# Language configurations
+# Language configurations, images are the pre-baked runtimes from docker/runtimes
 LANGUAGE_CONFIG = {
     'python': {
-        'image': 'python:3.9-alpine',
-        'cmd': ['python', '-c'],
+        'image': 'rapidcompiler/python:3.9-r1',
+        'run_cmd': ['python', '/tmp/code.py'],
+        'source_file': 'code.py',
         'extension': '.py'
     },
     'javascript': {
-        'image': 'node:16-alpine',
-        'cmd': ['node', '-e'],
+        'image': 'rapidcompiler/node:16-r2',
+        'run_cmd': ['node', '/tmp/code.js'],
+        'source_file': 'code.js',
         'extension': '.js'
     },
     'c': {
-        'image': 'gcc:latest',
+        'image': 'rapidcompiler/gcc:12-r1',
         'compile_cmd': ['gcc', '-o', '/tmp/program', '/tmp/code.c'],
+        # Compile and run in one container when no warm one is free
+        'single_container': {'compile_timeout': 15, 'run_timeout': 10, 'run_memory_mb': 128},
         'run_cmd': ['/tmp/program'],
         'extension': '.c'
     },
     'cpp': {
-        'image': 'gcc:latest',
+        'image': 'rapidcompiler/gcc:12-r1',
         'compile_cmd': ['g++', '-o', '/tmp/program', '/tmp/code.cpp'],
+        # Compile and run in one container when no warm one is free
+        'single_container': {'compile_timeout': 15, 'run_timeout': 10, 'run_memory_mb': 128},
         'run_cmd': ['/tmp/program'],
         'extension': '.cpp'
     },
     'java': {
-        'image': 'openjdk:11-alpine',
+        'image': 'rapidcompiler/java:11-r2',
         'compile_cmd': ['javac', '/tmp/Main.java'],
         'run_cmd': ['java', '-cp', '/tmp', 'Main'],
         'extension': '.java'
     }
 }
 
-def execute_code(language, code, input_data=""):
-    if language not in LANGUAGE_CONFIG:
-        return {"error": "Unsupported language"}
-    
-    config = LANGUAGE_CONFIG[language]
-    client = docker.from_env()
-    
-    try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            if language in ['c', 'cpp', 'java']:
-                filename = f"code{config['extension']}"
-                if language == 'java':
-                    filename = "Main.java"
-                
-                code_file = os.path.join(temp_dir, filename)
-                with open(code_file, 'w') as f:
-                    f.write(code)
-                
-                # Compile
-                client.containers.run(
-                    config['image'],
-                    config['compile_cmd'],
-                    volumes={temp_dir: {'bind': '/tmp', 'mode': 'rw'}},
-                    mem_limit='128m',
-                    remove=True,
-                    timeout=10
-                )
-                
-                # Run
-                result = client.containers.run(
-                    config['image'],
-                    config['run_cmd'],
-                    volumes={temp_dir: {'bind': '/tmp', 'mode': 'rw'}},
-                    mem_limit='128m',
-                    network_disabled=True,
-                    remove=True,
-                    timeout=10,
-                    input=input_data.encode() if input_data else None
-                )
-            else:
-                result = client.containers.run(
-                    config['image'],
-                    config['cmd'] + [code],
-                    mem_limit='128m',
-                    network_disabled=True,
-                    remove=True,
-                    timeout=10,
-                    input=input_data.encode() if input_data else None
-                )
-            
-            return {"output": result.decode('utf-8'), "error": None}
-    
-    except docker.errors.ContainerError as e:
-        return {"output": "", "error": e.stderr.decode('utf-8') if e.stderr else str(e)}
-    except Exception as e:
-        return {"output": "", "error": str(e)}
+pin_language_images(LANGUAGE_CONFIG)
+
+# Pull missing images now rather than on the first request for each language
+prefetch_images(LANGUAGE_CONFIG)
+
+# No pool or compile cache here: every run is a one-shot container unless
+# EXECUTOR_ISOLATION lowers a language's policy to a local backend
+executor = ExecutorRouter([DockerExecutor(LANGUAGE_CONFIG), SandboxExecutor(), LocalExecutor()],
+                          parse_isolation_policy(default='container'))
+
+def execute_code(language, code, input_data="", timings=None):
+    return executor.run(language, code, input_data, timings).to_response()
 
 # Routes
 @app.route('/api/run', methods=['POST'])
@@ -180,20 +161,27 @@ def run_code():
     if not language or not code:
         return jsonify({"error": "Language and code are required"}), 400
     
-    result = execute_code(language, code, input_data)
+    too_large = size_error(code, input_data)
+    if too_large:
+        return jsonify({"error": too_large}), 413
+    
+    timings = {}
+    label = language_label(language, LANGUAGE_CONFIG)
+    with track_in_flight(label):
+        result = execute_code(language, code, input_data, timings)
+    observe_execution(label, execution_status(result, timings), timings)
     return jsonify(result)
 
 @app.route('/api/users/<user_id>', methods=['GET'])
 @auth_required
 def get_user_profile(user_id):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-    user = cur.fetchone()
-    
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        
+        cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+        user = cur.fetchone()
+        
+        cur.close()
     
     if not user:
         return jsonify({"error": "User not found"}), 404
@@ -212,27 +200,26 @@ def get_user_profile(user_id):
 @auth_required
 def create_user_profile():
     data = request.get_json()
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        INSERT INTO users (id, email, username, full_name, avatar_url, is_admin, created_at)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        RETURNING *
-    """, (
-        data['id'],
-        data['email'],
-        data['username'],
-        data.get('full_name', ''),
-        data.get('avatar_url'),
-        data.get('is_admin', False),
-        datetime.utcnow()
-    ))
-    
-    user = cur.fetchone()
-    conn.commit()
-    cur.close()
-    conn.close()
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        
+        cur.execute("""
+            INSERT INTO users (id, email, username, full_name, avatar_url, is_admin, created_at)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING *
+        """, (
+            data['id'],
+            data['email'],
+            data['username'],
+            data.get('full_name', ''),
+            data.get('avatar_url'),
+            data.get('is_admin', False),
+            datetime.utcnow()
+        ))
+        
+        user = cur.fetchone()
+        conn.commit()
+        cur.close()
     
     return jsonify({
         "id": user[0],
@@ -248,58 +235,86 @@ def create_user_profile():
 @auth_required
 def projects():
     user_id = request.current_user['sub']
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    if request.method == 'POST':
-        data = request.get_json()
-        project_id = str(uuid.uuid4())
-        share_id = str(uuid.uuid4())
-        
-        cur.execute("""
-            INSERT INTO projects (id, user_id, title, language, code, share_id, is_public, created_at, updated_at)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING *
-        """, (
-            project_id,
-            user_id,
-            data.get('title'),
-            data.get('language'),
-            data.get('code'),
-            share_id,
-            False,
-            datetime.utcnow(),
-            datetime.utcnow()
-        ))
+    headers = {}
+    with get_db_connection() as conn:
+        cur = conn.cursor()
         
-        project = cur.fetchone()
-        conn.commit()
-        
-        result = {
-            "id": project[0],
-            "title": project[2],
-            "language": project[3],
-            "share_id": project[5]
-        }
-    else:
-        cur.execute("SELECT * FROM projects WHERE user_id = %s ORDER BY created_at DESC", (user_id,))
-        projects = cur.fetchall()
+        if request.method == 'POST':
+            data = request.get_json()
+            project_id = str(uuid.uuid4())
+            share_id = str(uuid.uuid4())
+            
+            cur.execute("""
+                INSERT INTO projects (id, user_id, title, language, code, share_id, is_public, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                RETURNING *
+            """, (
+                project_id,
+                user_id,
+                data.get('title'),
+                data.get('language'),
+                data.get('code'),
+                share_id,
+                False,
+                datetime.utcnow(),
+                datetime.utcnow()
+            ))
+            
+            project = cur.fetchone()
+            conn.commit()
+            
+            result = {
+                "id": project[0],
+                "title": project[2],
+                "language": project[3],
+                "share_id": project[5]
+            }
+        else:
+            # Only the listed columns, never the code; keyset pagination on
+            # (created_at, id) matches idx_projects_user_created
+            query = """
+                SELECT id, title, language, share_id, created_at FROM projects
+                WHERE user_id = %s {keyset}
+                ORDER BY created_at DESC, id DESC
+                {limit}
+            """
+            params = [user_id]
+            keyset = limit_clause = ""
+            
+            if 'limit' in request.args or 'cursor' in request.args:
+                limit = parse_limit(request.args.get('limit'))
+                if request.args.get('cursor'):
+                    try:
+                        created_at, last_id = decode_cursor(request.args['cursor'])
+                        params += [created_at, str(uuid.UUID(last_id))]
+                    except (InvalidCursor, ValueError):
+                        cur.close()
+                        return jsonify({"error": "Invalid cursor"}), 400
+                    keyset = "AND (created_at, id) < (%s, %s::uuid)"
+                limit_clause = "LIMIT %s"
+                params.append(limit + 1)
+            
+            cur.execute(query.format(keyset=keyset, limit=limit_clause), params)
+            projects = cur.fetchall()
+            
+            if limit_clause:
+                headers = page_headers(projects, limit, lambda p: encode_cursor(p[4], p[0]))
+                projects = projects[:limit]
+            
+            result = [{
+                "id": p[0],
+                "title": p[1],
+                "language": p[2],
+                "share_id": p[3],
+                "created_at": p[4].isoformat()
+            } for p in projects]
         
-        result = [{
-            "id": p[0],
-            "title": p[2],
-            "language": p[3],
-            "share_id": p[5],
-            "created_at": p[7].isoformat()
-        } for p in projects]
-    
-    cur.close()
-    conn.close()
-    return jsonify(result)
+        cur.close()
+    return jsonify(result), 200, headers
 
 @app.route('/api/health')
 def health_check():
-    return jsonify({"status": "healthy", "database": "neon"})
+    return jsonify({"status": "healthy", "database": "neon", "db_pool": db_pool.stats()})
 
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -1,159 +1,60 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+from flask_sock import Sock
 import subprocess
 import tempfile
-import os
-import time
 import shutil
+from streaming import SubprocessStream, receive_start, send_error, stream_execution
+from sandbox import RUN_LIMITS, SANDBOX_ENABLED, Sandbox
+from executors import LOCAL_LANGUAGE_CONFIG, ExecutorRouter, LocalExecutor, SandboxExecutor, parse_isolation_policy
+from metrics import instrument_app, language_label, observe_execution, track_in_flight
+from telemetry import execution_status
+from request_limits import limit_request_size, size_error
 
 app = Flask(__name__)
 CORS(app)
+sock = Sock(app)
+instrument_app(app)
+limit_request_size(app)
 
-# Language configurations for local execution
-LANGUAGE_CONFIG = {
-    'python': {
-        'cmd': ['python', '-c'],
-        'extension': '.py'
-    },
-    'javascript': {
-        'cmd': ['node', '-e'],
-        'extension': '.js'
-    },
-    'c': {
-        'compile_cmd': ['gcc', '-o'],
-        'extension': '.c'
-    },
-    'cpp': {
-        'compile_cmd': ['g++', '-o'],
-        'extension': '.cpp'
-    },
-    'java': {
-        'compile_cmd': ['javac'],
-        'run_cmd': ['java'],
-        'extension': '.java'
-    }
-}
+# Runs under sandbox.py when SANDBOX_ENABLED, plain subprocesses otherwise
+# (EXECUTOR_ISOLATION=none forces the latter)
+executor = ExecutorRouter([SandboxExecutor(), LocalExecutor()],
+                          parse_isolation_policy(default='process' if SANDBOX_ENABLED else 'none'))
 
-def execute_code_local(language, code, input_data=""):
+def execute_code_local(language, code, input_data="", timings=None):
     """Execute code locally with basic security"""
-    if language not in LANGUAGE_CONFIG:
-        return {"error": "Unsupported language"}
+    return executor.run(language, code, input_data, timings).to_response()
+
+@sock.route('/ws/run')
+def run_code_stream(ws):
+    """Stream stdout/stderr of an execution as it runs (protocol in streaming.py)"""
+    start = receive_start(ws)
+    if not start:
+        return
+    language, code, input_data = start
     
-    config = LANGUAGE_CONFIG[language]
+    backend = executor.backend_for(language)
+    if backend is None:
+        send_error(ws, "Unsupported language")
+        return
     
+    work_dir = tempfile.mkdtemp()
     try:
-        if language == 'python':
-            result = subprocess.run(
-                config['cmd'] + [code],
-                input=input_data,
-                text=True,
-                capture_output=True,
-                timeout=10
-            )
-            
-        elif language == 'javascript':
-            result = subprocess.run(
-                config['cmd'] + [code],
-                input=input_data,
-                text=True,
-                capture_output=True,
-                timeout=10
-            )
-            
-        elif language in ['c', 'cpp']:
-            # Create temporary files
-            with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'], delete=False) as source_file:
-                source_file.write(code)
-                source_path = source_file.name
-            
-            exe_path = source_path.replace(config['extension'], '.exe')
-            
-            try:
-                # Compile
-                compile_result = subprocess.run(
-                    config['compile_cmd'] + [exe_path, source_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if compile_result.returncode != 0:
-                    return {"output": "", "error": f"Compilation Error: {compile_result.stderr}"}
-                
-                # Execute
-                result = subprocess.run(
-                    [exe_path],
-                    input=input_data,
-                    text=True,
-                    capture_output=True,
-                    timeout=10
-                )
-                
-            finally:
-                # Cleanup
-                try:
-                    os.unlink(source_path)
-                    if os.path.exists(exe_path):
-                        os.unlink(exe_path)
-                except:
-                    pass
-                    
-        elif language == 'java':
-            # Create temporary directory and file
-            temp_dir = tempfile.mkdtemp()
-            java_file = os.path.join(temp_dir, 'Main.java')
-            
-            try:
-                # Write Java code
-                with open(java_file, 'w') as f:
-                    f.write(code)
-                
-                # Compile
-                compile_result = subprocess.run(
-                    config['compile_cmd'] + [java_file],
-                    capture_output=True,
-                    text=True,
-                    timeout=10,
-                    cwd=temp_dir
-                )
-                
-                if compile_result.returncode != 0:
-                    return {"output": "", "error": f"Compilation Error: {compile_result.stderr}"}
-                
-                # Execute
-                result = subprocess.run(
-                    config['run_cmd'] + ['Main'],
-                    input=input_data,
-                    text=True,
-                    capture_output=True,
-                    timeout=10,
-                    cwd=temp_dir
-                )
-                
-            finally:
-                # Cleanup
-                import shutil
-                try:
-                    shutil.rmtree(temp_dir)
-                except:
-                    pass
+        cmd, error = backend.prepare(language, code, work_dir)
+        if error:
+            send_error(ws, error)
+            return
         
-        if result.returncode == 0:
-            return {"output": result.stdout, "error": None}
-        else:
-            return {"output": "", "error": result.stderr}
-    
+        limits = dict(RUN_LIMITS, **(backend.limits(language) or {}))
+        sandbox = Sandbox(work_dir=work_dir, isolate=backend.sandboxed, **limits)
+        stream_execution(ws, SubprocessStream(cmd, cwd=work_dir, sandbox=sandbox), input_data)
     except subprocess.TimeoutExpired:
-        return {"output": "", "error": "Execution timeout (10s limit)"}
+        send_error(ws, "Compilation timeout (10s limit)")
     except FileNotFoundError as e:
-        if 'gcc' in str(e) or 'g++' in str(e):
-            return {"output": "", "error": "C/C++ compiler not found. Please install MinGW or GCC."}
-        elif 'javac' in str(e) or 'java' in str(e):
-            return {"output": "", "error": "Java compiler not found. Please install JDK."}
-        else:
-            return {"output": "", "error": str(e)}
-    except Exception as e:
-        return {"output": "", "error": str(e)}
+        send_error(ws, str(e))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
 
 @app.route('/api/run', methods=['POST'])
 def run_code():
@@ -165,7 +66,15 @@ def run_code():
     if not language or not code:
         return jsonify({"error": "Language and code are required"}), 400
     
-    result = execute_code_local(language, code, input_data)
+    too_large = size_error(code, input_data)
+    if too_large:
+        return jsonify({"error": too_large}), 413
+    
+    timings = {}
+    label = language_label(language, LOCAL_LANGUAGE_CONFIG)
+    with track_in_flight(label):
+        result = execute_code_local(language, code, input_data, timings)
+    observe_execution(label, execution_status(result, timings), timings)
     return jsonify(result)
 
 @app.route('/api/health', methods=['GET'])
@@ -1,124 +1,35 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import subprocess
 import tempfile
-import os
-import time
-import shutil
+from sandbox import SANDBOX_ENABLED
+from request_limits import limit_request_size, size_error
+from executors import LOCAL_LANGUAGE_CONFIG, ExecutorRouter, LocalExecutor, SandboxExecutor, parse_isolation_policy
 
 app = Flask(__name__)
 CORS(app)
+limit_request_size(app)
 
-# Language configurations for local execution
-LANGUAGE_CONFIG = {
-    'python': {
-        'cmd': ['python', '-c'],
-        'extension': '.py'
-    },
-    'javascript': {
-        'cmd': ['node', '-e'],
-        'extension': '.js'
-    },
-    'c': {
-        'compile_cmd': ['gcc', '-o'],
-        'extension': '.c'
-    },
-    'cpp': {
-        'compile_cmd': ['g++', '-o'],
-        'extension': '.cpp'
-    },
-    'web': {
-        'extension': '.html'
-    }
+# Local toolchains (no Java here), plus 'web' which just writes an HTML file
+EXECUTOR_LANGUAGES = {
+    language: LOCAL_LANGUAGE_CONFIG[language] for language in ['python', 'javascript', 'c', 'cpp']
 }
+LANGUAGE_CONFIG = dict(EXECUTOR_LANGUAGES, web={'extension': '.html'})
+
+executor = ExecutorRouter([SandboxExecutor(EXECUTOR_LANGUAGES), LocalExecutor(EXECUTOR_LANGUAGES)],
+                          parse_isolation_policy(default='process' if SANDBOX_ENABLED else 'none'))
 
 def execute_code_local(language, code, input_data=""):
     """Execute code locally with basic security"""
-    if language not in LANGUAGE_CONFIG:
-        return {"error": "Unsupported language"}
-    
-    config = LANGUAGE_CONFIG[language]
-    
-    try:
-        if language == 'python':
-            result = subprocess.run(
-                config['cmd'] + [code],
-                input=input_data,
-                text=True,
-                capture_output=True,
-                timeout=10
-            )
-            
-        elif language == 'javascript':
-            result = subprocess.run(
-                config['cmd'] + [code],
-                input=input_data,
-                text=True,
-                capture_output=True,
-                timeout=10
-            )
-            
-        elif language == 'web':
-            # Create HTML file with embedded CSS/JS
-            with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as html_file:
-                html_file.write(code)
-                html_path = html_file.name
-            
-            # Return file path for frontend to open
-            return {"output": f"Web page created: file:///{html_path.replace(chr(92), '/')}", "error": None, "html_path": html_path}
-                
-        elif language in ['c', 'cpp']:
-            # Create temporary files
-            with tempfile.NamedTemporaryFile(mode='w', suffix=config['extension'], delete=False) as source_file:
-                source_file.write(code)
-                source_path = source_file.name
-            
-            exe_path = source_path.replace(config['extension'], '.exe')
-            
-            try:
-                # Compile
-                compile_result = subprocess.run(
-                    config['compile_cmd'] + [exe_path, source_path],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                
-                if compile_result.returncode != 0:
-                    return {"output": "", "error": f"Compilation Error: {compile_result.stderr}"}
-                
-                # Execute
-                result = subprocess.run(
-                    [exe_path],
-                    input=input_data,
-                    text=True,
-                    capture_output=True,
-                    timeout=10
-                )
-                
-            finally:
-                # Cleanup
-                try:
-                    os.unlink(source_path)
-                    if os.path.exists(exe_path):
-                        os.unlink(exe_path)
-                except:
-                    pass
+    if language == 'web':
+        # Create HTML file with embedded CSS/JS
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.html', delete=False) as html_file:
+            html_file.write(code)
+            html_path = html_file.name
         
-        if result.returncode == 0:
-            return {"output": result.stdout, "error": None}
-        else:
-            return {"output": "", "error": result.stderr}
+        # Return file path for frontend to open
+        return {"output": f"Web page created: file:///{html_path.replace(chr(92), '/')}", "error": None, "html_path": html_path}
     
-    except subprocess.TimeoutExpired:
-        return {"output": "", "error": "Execution timeout (10s limit)"}
-    except FileNotFoundError as e:
-        if 'gcc' in str(e) or 'g++' in str(e):
-            return {"output": "", "error": "C/C++ compiler not found. Please install MinGW or GCC."}
-        else:
-            return {"output": "", "error": str(e)}
-    except Exception as e:
-        return {"output": "", "error": str(e)}
+    return executor.run(language, code, input_data).to_response()
 
 @app.route('/api/run', methods=['POST'])
 def run_code():
@@ -133,6 +44,10 @@ def run_code():
     if not language or not code:
         return jsonify({"error": "Language and code are required"}), 400
     
+    too_large = size_error(code, input_data)
+    if too_large:
+        return jsonify({"error": too_large}), 413
+    
     result = execute_code_local(language, code, input_data)
     return jsonify(result)
 
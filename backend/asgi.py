@@ -0,0 +1,186 @@
+"""Asyncio entry point: the same API as wsgi.py behind an ASGI server.
+
+    gunicorn -c gunicorn_asgi.conf.py asgi:app
+
+POST /api/run and /ws/run are served here. A run waiting for admission
+(admission.py) is a coroutine, not a blocked thread, and a WebSocket stream
+relays the container's exec socket on the event loop. Every other route is the
+Flask app, run on a2wsgi's thread pool.
+"""
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from admission import Rejected
+from app import (LANGUAGE_CONFIG, acquire_runner, app as flask_app, client_address, docker_executor, invalid_run,
+                 queue_timings, request_caller, run_request, runtime_unavailable, scheduler)
+from metrics import HTTP_REQUEST_SECONDS
+from request_limits import MAX_BODY_BYTES, body_size_error
+from streaming import (AsyncExecStream, DockerExecStream, error_message, queued_message, receive_start_async,
+                       stream_execution_async)
+
+# Executions block a thread for as long as they run (Docker SDK calls).
+# Admitted runs should not wait for one, so keep this at or above
+# ADMISSION_MAX_CONCURRENT; runs waiting for admission hold no thread.
+ASGI_EXECUTION_THREADS = int(os.getenv('ASGI_EXECUTION_THREADS', '32'))
+# Threads for the routes served by the Flask app
+ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '16'))
+
+execution_threads = ThreadPoolExecutor(ASGI_EXECUTION_THREADS, thread_name_prefix='execution')
+
+
+async def in_execution_thread(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(execution_threads, func, *args)
+
+
+async def read_json(request, limit=MAX_BODY_BYTES):
+    """Returns (body, None) or (None, error response); bodies over limit get 413"""
+    length = request.headers.get('content-length', '')
+    if length.isdigit() and int(length) > limit:
+        return None, JSONResponse({"error": body_size_error(limit)}, 413, headers={'Connection': 'close'})
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            return None, JSONResponse({"error": body_size_error(limit)}, 413, headers={'Connection': 'close'})
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return None, JSONResponse({"error": "Request body must be a JSON object"}, 400)
+    return data, None
+
+
+@asynccontextmanager
+async def admitted(connection, language, on_queued=None):
+    """app.admitted() for the event loop; on_queued is a coroutine function"""
+    if not scheduler:
+        yield None
+        return
+    address = client_address(connection.client.host if connection.client else None,
+                             connection.headers.get('x-forwarded-for'))
+    caller, tier = request_caller(connection.headers.get('authorization'), address)
+    ticket = scheduler.submit(caller, tier, language)
+    try:
+        if ticket.started is None:
+            if on_queued:
+                await on_queued(ticket)
+            await scheduler.wait_async(ticket)
+        yield ticket
+    finally:
+        scheduler.release(ticket)
+
+
+async def run_code(request):
+    started = time.perf_counter()
+    data, response = await read_json(request)
+    invalid = invalid_run(data) if response is None else None
+    if invalid:
+        response = JSONResponse(*invalid)
+    if response is None:
+        try:
+            async with admitted(request, data.get('language')) as ticket:
+                body, status, headers = await in_execution_thread(run_request, data, queue_timings(ticket))
+        except Rejected as e:
+            response = JSONResponse(e.response(), e.status, headers={'Retry-After': str(e.retry_after)})
+        else:
+            if ticket and ticket.wait_ms:
+                headers['X-Queue-Wait-Ms'] = str(ticket.wait_ms)
+            response = JSONResponse(body, status, headers=headers)
+
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, method='POST', route='/api/run',
+                                 status=response.status_code)
+    return response
+
+
+class WebSocketChannel:
+    """Starlette WebSocket with the interface streaming.py expects"""
+
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def receive(self, timeout=None):
+        try:
+            message = await asyncio.wait_for(self.websocket.receive_text(), timeout)
+        except (WebSocketDisconnect, asyncio.TimeoutError, RuntimeError):
+            return None
+        if len(message) > MAX_BODY_BYTES:
+            await self.websocket.close(code=1009)
+            return None
+        return message
+
+    async def send(self, text):
+        await self.websocket.send_text(text)
+
+
+async def run_code_stream(websocket):
+    """Streaming executions, same protocol as the Flask route (see streaming.py)"""
+    await websocket.accept()
+    ws = WebSocketChannel(websocket)
+    try:
+        start = await receive_start_async(ws)
+        if not start:
+            return
+        language, code, input_data = start
+
+        if language not in LANGUAGE_CONFIG:
+            await ws.send(error_message("Unsupported language"))
+            return
+
+        unavailable = await asyncio.to_thread(runtime_unavailable, language)
+        if unavailable:
+            await ws.send(error_message(unavailable))
+            return
+
+        async def on_queued(ticket):
+            await ws.send(queued_message(ticket))
+
+        async with admitted(websocket, language, on_queued):
+            runner, release = await in_execution_thread(acquire_runner, language)
+            try:
+                error = await in_execution_thread(docker_executor.prepare_pooled, runner, language, code)
+                if error:
+                    await ws.send(error_message(error))
+                    return
+
+                stream = await asyncio.to_thread(DockerExecStream, runner.container,
+                                                 LANGUAGE_CONFIG[language]['run_cmd'])
+                await stream_execution_async(ws, AsyncExecStream(stream), input_data)
+            finally:
+                await asyncio.to_thread(release)
+    except Rejected as e:
+        await ws.send(error_message(f"{e} (retry after {e.retry_after}s)"))
+    except (WebSocketDisconnect, OSError):
+        # Client went away; the server closes the connection once we return
+        return
+
+
+@asynccontextmanager
+async def lifespan(_):
+    yield
+    execution_threads.shutdown(wait=False, cancel_futures=True)
+
+
+app = Starlette(
+    routes=[
+        Route('/api/run', run_code, methods=['POST']),
+        WebSocketRoute('/ws/run', run_code_stream),
+        Mount('/', app=WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)),
+    ],
+    # Same policy as CORS(app) on the Flask side; the Flask routes keep their
+    # own headers, this replaces rather than duplicates them
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan
+)
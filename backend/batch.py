@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from container_pool import put_files
+
+BATCH_MAX_CASES = int(os.getenv('BATCH_MAX_CASES', '100'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+BATCH_CASE_TIMEOUT = int(os.getenv('BATCH_CASE_TIMEOUT', '5'))
+BATCH_MAX_CASE_OUTPUT = 64 * 1024
+# Batch bodies carry every case's input and expected output
+BATCH_MAX_BODY_BYTES = int(os.getenv('BATCH_MAX_BODY_BYTES', str(8 * 1024 * 1024)))
+
+# Runs one test case inside the sandbox: feeds the input file, enforces the
+# time limit itself with timeout(1) (so a slow case never kills the container
+# other cases are running in, however starved the shell is) and samples the
+# peak RSS of the program from /proc using only shell builtins.
+# Usage: sh -c CASE_RUNNER sh <input file> <timeout s> <cmd...>
+CASE_RUNNER = r'''
+input=$1; secs=$2; shift 2
+field() {
+  value=
+  while read -r key rest; do
+    [ "$key" = "$2:" ] && { set -- $rest; value=$1; break; }
+  done 2>/dev/null < /proc/$1/status
+}
+started=$(date +%s%N)
+timeout -k 1 "$secs" "$@" < "$input" &
+pid=$!
+peak=0
+while :; do
+  field $pid State
+  [ -z "$value" ] || [ "$value" = Z ] && break
+  child=
+  read -r child _ 2>/dev/null < /proc/$pid/task/$pid/children
+  if [ -n "$child" ]; then
+    field $child VmHWM
+    [ -n "$value" ] && peak=$value
+  fi
+  sleep 0.01
+done
+wait $pid
+status=$?
+elapsed=$(( ($(date +%s%N) - started) / 1000000 ))
+# 124: timed out; 137: still running a second later and killed
+if [ $status -eq 124 ] || { [ $status -eq 137 ] && [ $elapsed -ge $((secs * 1000)) ]; }; then
+  echo "__RC_TIMEOUT__" >&2
+fi
+echo "__RC_STATS__ $status $peak" >&2
+exit $status
+'''
+
+
+def normalize_output(text):
+    """Compare outputs ignoring trailing whitespace on each line and at the end"""
+    return '\n'.join(line.rstrip() for line in text.rstrip().splitlines())
+
+
+def parse_runner_stderr(stderr):
+    """Split the runner's marker lines off stderr, returns (stderr, timed_out, memory_kb)"""
+    timed_out = False
+    memory_kb = None
+    lines = []
+    for line in stderr.splitlines(keepends=True):
+        if line.startswith('__RC_TIMEOUT__'):
+            timed_out = True
+        elif line.startswith('__RC_STATS__'):
+            peak = int(line.split()[2])
+            memory_kb = peak or None
+        else:
+            lines.append(line)
+    return ''.join(lines), timed_out, memory_kb
+
+
+def verdict_for(exit_code, timed_out, output, expected):
+    if timed_out:
+        return 'time_limit_exceeded'
+    if exit_code != 0:
+        return 'runtime_error'
+    if expected is None:
+        return 'completed'
+    return 'accepted' if normalize_output(output) == normalize_output(expected) else 'wrong_answer'
+
+
+def run_batch(pooled, run_cmd, cases, concurrency=BATCH_MAX_CONCURRENCY,
+              fail_fast=False, case_timeout=BATCH_CASE_TIMEOUT):
+    """Run an already compiled program against every case inside one sandbox"""
+    put_files(pooled.container, {f"case-{index}.in": case.get('input') or '' for index, case in enumerate(cases)})
+
+    stop = threading.Event()
+    results = [None] * len(cases)
+
+    def run_case(index):
+        case = cases[index]
+        if stop.is_set():
+            results[index] = {"index": index, "verdict": "skipped"}
+            return
+
+        cmd = ['sh', '-c', CASE_RUNNER, 'sh', f"/tmp/case-{index}.in", str(case_timeout)] + run_cmd
+        started = time.time()
+        # Other cases share the container: past the cap, output is dropped
+        # until the runner's time limit ends the case
+        exit_code, capture, killed = pooled.exec(cmd, timeout=case_timeout + 5, kill_on_overflow=False)
+        elapsed_ms = int((time.time() - started) * 1000)
+
+        stderr, timed_out, memory_kb = parse_runner_stderr(capture.stderr)
+        output = capture.stdout
+        if capture.truncated:
+            verdict = 'output_limit_exceeded'
+        else:
+            verdict = verdict_for(exit_code, timed_out or killed, output, case.get('expected_output'))
+
+        results[index] = {
+            "index": index,
+            "verdict": verdict,
+            "exit_code": exit_code,
+            "time_ms": elapsed_ms,
+            "memory_kb": memory_kb,
+            "output": output[:BATCH_MAX_CASE_OUTPUT],
+            "truncated": capture.truncated or len(output) > BATCH_MAX_CASE_OUTPUT,
+            "error": stderr[:BATCH_MAX_CASE_OUTPUT] or None
+        }
+        if fail_fast and verdict not in ('accepted', 'completed'):
+            stop.set()
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, BATCH_MAX_CONCURRENCY))) as executor:
+        list(executor.map(run_case, range(len(cases))))
+
+    return results
+
+
+def summarize(results):
+    verdicts = [result['verdict'] for result in results]
+    return {
+        "total": len(results),
+        "passed": sum(1 for verdict in verdicts if verdict in ('accepted', 'completed')),
+        "failed": sum(1 for verdict in verdicts if verdict not in ('accepted', 'completed', 'skipped')),
+        "skipped": verdicts.count('skipped')
+    }
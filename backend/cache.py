@@ -0,0 +1,81 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL, values must be JSON-like"""
+
+    def __init__(self, max_entries=1024, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (value, expires_at)
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[1] > time.time():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + (ttl or self.ttl)
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+
+class RedisCache:
+    """Same interface backed by Redis, shared by every worker process"""
+
+    def __init__(self, url, prefix, ttl=60):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        data = self.redis.get(f"{self.prefix}:{key}")
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(data)
+
+    def set(self, key, value, ttl=None):
+        self.redis.set(f"{self.prefix}:{key}", json.dumps(value), ex=ttl or self.ttl)
+
+    def delete(self, key):
+        self.redis.delete(f"{self.prefix}:{key}")
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def make_cache(url=None, prefix='rapidcompiler', max_entries=1024, ttl=60):
+    """Redis-backed cache when a URL is configured, in-process LRU otherwise"""
+    if url:
+        return RedisCache(url, prefix, ttl=ttl)
+    return LRUCache(max_entries=max_entries, ttl=ttl)
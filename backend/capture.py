@@ -0,0 +1,102 @@
+import codecs
+import os
+import threading
+
+# Cap on a run's stdout + stderr. Past it the run is killed (or, where it
+# can't be, the rest is drained and dropped) and the result is marked
+# truncated. The last OUTPUT_TAIL_BYTES of each stream are kept regardless,
+# so a traceback at the end of a long log still shows up.
+OUTPUT_MAX_BYTES = int(os.getenv('OUTPUT_MAX_BYTES', str(1024 * 1024)))
+OUTPUT_TAIL_BYTES = int(os.getenv('OUTPUT_TAIL_BYTES', str(16 * 1024)))
+
+
+def output_limit_message(max_bytes=OUTPUT_MAX_BYTES):
+    return f"Output limit exceeded ({max_bytes // 1024}KB)"
+
+
+class StreamBuffer:
+    """Head + tail of one stream: the first head_bytes, decoded as they
+    arrive, and a ring of the last tail_bytes after that"""
+
+    def __init__(self, head_bytes, tail_bytes):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self.head = []
+        self.head_length = 0
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        room = self.head_bytes - self.head_length
+        if room > 0:
+            self.head.append(self.decoder.decode(data[:room]))
+            self.head_length += min(room, len(data))
+            data = data[room:]
+        if data and self.tail_bytes:
+            self.tail += data
+            del self.tail[:-self.tail_bytes]
+
+    @property
+    def dropped(self):
+        return self.total - self.head_length - len(self.tail)
+
+    def text(self):
+        # Bytes of a character split at the end of the head are still in the
+        # decoder; decode them here without finishing it, so text() can be
+        # called again and writes can continue
+        head = ''.join(self.head)
+        pending = self.decoder.getstate()[0]
+        if not self.dropped:
+            return head + (pending + bytes(self.tail)).decode('utf-8', errors='replace')
+        # The ring can start in the middle of a character
+        tail = bytes(self.tail)
+        start = 0
+        while start < min(3, len(tail)) and tail[start] & 0xC0 == 0x80:
+            start += 1
+        return (head + pending.decode('utf-8', errors='replace')
+                + f"\n... [{self.dropped} bytes truncated] ...\n"
+                + tail[start:].decode('utf-8', errors='replace'))
+
+
+class OutputCapture:
+    """Bounded capture of a run's stdout and stderr.
+
+    feed() may be called from one reader thread per stream. on_overflow is
+    called once, from the reader that crosses max_bytes (typically to kill
+    the run); capture keeps going within the same memory bound afterwards.
+    """
+
+    def __init__(self, max_bytes=OUTPUT_MAX_BYTES, tail_bytes=OUTPUT_TAIL_BYTES, on_overflow=None):
+        tail_bytes = min(tail_bytes, max_bytes)
+        self.max_bytes = max_bytes
+        self.streams = {name: StreamBuffer(max_bytes - tail_bytes, tail_bytes) for name in ('stdout', 'stderr')}
+        self.on_overflow = on_overflow
+        self.truncated = False
+        self.lock = threading.Lock()
+
+    def feed(self, name, data):
+        with self.lock:
+            self.streams[name].write(data)
+            overflowed = not self.truncated and self.output_bytes > self.max_bytes
+            if overflowed:
+                self.truncated = True
+        if overflowed and self.on_overflow:
+            self.on_overflow()
+
+    @property
+    def output_bytes(self):
+        return sum(stream.total for stream in self.streams.values())
+
+    def text(self, name):
+        with self.lock:
+            return self.streams[name].text()
+
+    @property
+    def stdout(self):
+        return self.text('stdout')
+
+    @property
+    def stderr(self):
+        return self.text('stderr')
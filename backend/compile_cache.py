@@ -0,0 +1,115 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+COMPILE_CACHE_DIR = os.getenv(
+    'COMPILE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'rapidcompiler-compile-cache')
+)
+COMPILE_CACHE_MAX_MB = int(os.getenv('COMPILE_CACHE_MAX_MB', '512'))
+# Half-written entries older than this belong to a writer that died
+STALE_TEMP_SECONDS = 3600
+
+
+class CompileCache:
+    """Content-addressed store of compiled artifacts with LRU eviction on disk.
+
+    Entries are tar archives of whatever the compile step produced (a binary,
+    a directory of .class files, emitted JS), keyed by a hash of everything
+    that can change the output.
+
+    The directory is the index: every gunicorn worker shares it, so lookups
+    go to the file, a hit bumps its mtime, and eviction scans the directory
+    and removes the least recently used files until all workers together
+    are under max_bytes.
+    """
+
+    def __init__(self, cache_dir=COMPILE_CACHE_DIR, max_bytes=COMPILE_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def key(language, config, code):
+        digest = hashlib.sha256()
+        for part in (language, config['image'], '\0'.join(config['compile_cmd']), code):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.tar")
+
+    def _scan(self):
+        """[(mtime, path, size)] of the cached artifacts, oldest first.
+        Temp files left behind by a crashed writer are removed."""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            try:
+                stat = entry.stat()
+                if entry.name.endswith('.tar'):
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+                elif entry.name.endswith('.tmp') and now - stat.st_mtime > STALE_TEMP_SECONDS:
+                    os.unlink(entry.path)
+            except FileNotFoundError:
+                pass  # Evicted or renamed by another worker meanwhile
+        entries.sort()
+        return entries
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _evict(self):
+        entries = self._scan()
+        total_bytes = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if total_bytes <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+                with self.lock:
+                    self.evictions += 1
+            except FileNotFoundError:
+                pass  # Another worker evicted it first
+            total_bytes -= size
+
+    def stats(self):
+        entries = self._scan()
+        with self.lock:
+            return {
+                "entries": len(entries),
+                "bytes": sum(size for _, _, size in entries),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+import uuid
+
+from container_pool import POOL_MAX_LIFETIME, copy_out, remove_sandbox, start_sandbox
+from streaming import DockerExecStream
+
+COMPILE_SERVER_ENABLED = os.getenv('COMPILE_SERVER_ENABLED', 'false').lower() == 'true'
+COMPILE_SERVER_MAX = int(os.getenv('COMPILE_SERVER_MAX', '2'))
+# Recycle a compiler after this many compilations or once it grows past
+# COMPILE_SERVER_MAX_RSS_MB, whichever comes first
+COMPILE_SERVER_MAX_COMPILES = int(os.getenv('COMPILE_SERVER_MAX_COMPILES', '200'))
+COMPILE_SERVER_MAX_RSS_MB = int(os.getenv('COMPILE_SERVER_MAX_RSS_MB', '384'))
+COMPILE_SERVER_TIMEOUT = int(os.getenv('COMPILE_SERVER_TIMEOUT', '15'))
+
+
+class CompileError(Exception):
+    """The source did not compile, str(e) is the compiler's diagnostics"""
+
+
+class CompileServerDown(Exception):
+    pass
+
+
+class CompileServer:
+    """A resident compiler (docker/runtimes/*/compile-server) in its own container.
+
+    The container only ever compiles: it is separate from the sandboxes that
+    run programs, has no network, and the compilers run no submitted code.
+    Requests go over the exec's stdin, diagnostics come back on its stdout
+    and artifacts are copied out of /tmp/build with tar over an exec.
+    """
+
+    def __init__(self, client, language, config):
+        server = config['compile_server']
+        self.language = language
+        self.config = config
+        self.sandbox = start_sandbox(client, f"{language}-compiler", config, mem_limit=server.get('mem_limit', '512m'))
+        self.stream = DockerExecStream(self.sandbox.container, server['cmd'])
+        self.frames = self.stream.frames()
+        self.buffer = b''
+        self.compiles = 0
+        self.rss = 0
+        self.broken = False
+        self.timed_out = False
+
+    def _expire(self):
+        # Reads on the exec socket can't time out; killing the container ends them
+        self.timed_out = True
+        self.broken = True
+        self.stream.kill()
+
+    def _read_line(self):
+        while b'\n' not in self.buffer:
+            self._fill()
+        line, _, self.buffer = self.buffer.partition(b'\n')
+        return line.decode('utf-8')
+
+    def _read_bytes(self, length):
+        while len(self.buffer) < length:
+            self._fill()
+        data, self.buffer = self.buffer[:length], self.buffer[length:]
+        return data
+
+    def _fill(self):
+        for stream, data in self.frames:
+            if stream == 'stdout':
+                self.buffer += data
+                return
+            print(f"{self.language} compile server: {data.decode('utf-8', errors='replace').rstrip()}")
+        raise CompileServerDown("compile server exited")
+
+    def compile(self, code):
+        """Returns the artifact as a tar archive, raises CompileError"""
+        request_id = uuid.uuid4().hex
+        source = code.encode('utf-8')
+        timer = threading.Timer(COMPILE_SERVER_TIMEOUT, self._expire)
+        timer.start()
+        try:
+            self.stream.write(f"{request_id} {len(source)}\n".encode('utf-8') + source)
+            reply_id, status, rss, length = self._read_line().split(' ')
+            diagnostics = self._read_bytes(int(length)).decode('utf-8', errors='replace')
+        except (OSError, ValueError, CompileServerDown) as e:
+            self.broken = True
+            if self.timed_out:
+                raise CompileError(f"Compilation timeout ({COMPILE_SERVER_TIMEOUT}s limit)") from e
+            raise CompileServerDown(str(e)) from e
+        finally:
+            timer.cancel()
+        if reply_id != request_id:
+            self.broken = True
+            raise CompileServerDown("compile server answered out of order")
+
+        self.compiles += 1
+        self.rss = int(rss)
+        if status != 'ok':
+            raise CompileError(diagnostics)
+        build_dir = f"/tmp/build/{request_id}"
+        artifact = copy_out(self.sandbox.container, f"{build_dir}/{os.path.basename(self.config['artifact'])}")
+        # /tmp is a size-capped tmpfs shared by every compile of this server
+        self.sandbox.container.exec_run(['rm', '-rf', build_dir])
+        return artifact
+
+    def should_recycle(self):
+        # The container exits after POOL_MAX_LIFETIME like any pooled sandbox
+        expiring = time.time() - self.sandbox.started_at > POOL_MAX_LIFETIME - 60
+        return (self.broken or expiring or self.compiles >= COMPILE_SERVER_MAX_COMPILES
+                or self.rss > COMPILE_SERVER_MAX_RSS_MB * 1024 * 1024)
+
+    def stop(self):
+        remove_sandbox(self.sandbox)
+
+
+class CompileServers:
+    """Up to max_servers resident compilers per language, started on demand"""
+
+    def __init__(self, client, language_config, max_servers=COMPILE_SERVER_MAX):
+        self.client = client
+        self.language_config = {
+            language: config for language, config in language_config.items() if 'compile_server' in config
+        }
+        self.max_servers = max_servers
+        self.idle = {language: [] for language in self.language_config}
+        self.started = {language: 0 for language in self.language_config}
+        self.recycled = 0
+        self.cond = threading.Condition()
+
+    def supports(self, language):
+        return language in self.language_config
+
+    def _acquire(self, language):
+        with self.cond:
+            while not self.idle[language] and self.started[language] >= self.max_servers:
+                self.cond.wait()
+            if self.idle[language]:
+                return self.idle[language].pop()
+            self.started[language] += 1
+        try:
+            return CompileServer(self.client, language, self.language_config[language])
+        except Exception:
+            self._forget(language)
+            raise
+
+    def _forget(self, language):
+        with self.cond:
+            self.started[language] -= 1
+            self.cond.notify()
+
+    def _release(self, server):
+        if server.should_recycle():
+            server.stop()
+            self.recycled += 1
+            self._forget(server.language)
+            return
+        with self.cond:
+            self.idle[server.language].append(server)
+            self.cond.notify()
+
+    def compile(self, language, code):
+        """Compile with a resident compiler, returns the artifact tar archive"""
+        server = self._acquire(language)
+        try:
+            return server.compile(code)
+        finally:
+            self._release(server)
+
+    def stats(self):
+        with self.cond:
+            return {
+                language: {"idle": len(self.idle[language]), "started": self.started[language]}
+                for language in self.language_config
+            }
+
+    def shutdown(self):
+        with self.cond:
+            servers = [server for idle in self.idle.values() for server in idle]
+            for idle in self.idle.values():
+                idle.clear()
+        for server in servers:
+            server.stop()
@@ -0,0 +1,294 @@
+import io
+import os
+import socket
+import tarfile
+import threading
+import time
+from collections import deque
+
+import docker
+
+from capture import OUTPUT_MAX_BYTES, OutputCapture
+
+# Label used to find containers started by the pool
+POOL_LABEL = 'rapidcompiler.pool'
+
+POOL_IDLE_TIMEOUT = int(os.getenv('POOL_IDLE_TIMEOUT', '300'))
+POOL_CHECK_INTERVAL = int(os.getenv('POOL_CHECK_INTERVAL', '5'))
+# Pooled containers exit (and are auto-removed) after this many seconds, so a
+# crashed backend never leaves sandboxes running behind
+POOL_MAX_LIFETIME = int(os.getenv('POOL_MAX_LIFETIME', '3600'))
+# Every sandbox's /tmp (sources, inputs, build output) is an in-memory tmpfs
+# of this size. Its pages count towards the container's memory limit, and it
+# goes away with the container, so nothing touches or outlives on host disk.
+SANDBOX_SCRATCH_MB = int(os.getenv('SANDBOX_SCRATCH_MB', '64'))
+
+
+def pool_sizes(language, config):
+    """Return (min, max) warm containers for a language, env vars win over config"""
+    prefix = f"POOL_{language.upper()}"
+    min_size = int(os.getenv(f"{prefix}_MIN", config.get('pool_min', 1)))
+    max_size = int(os.getenv(f"{prefix}_MAX", config.get('pool_max', 4)))
+    return min_size, max(min_size, max_size)
+
+
+def copy_in(container, archive, path='/tmp'):
+    """Extract a tar archive into a running sandbox.
+
+    The archive API writes beneath a tmpfs mount rather than into it, so the
+    archive is streamed to tar over an exec's stdin instead.
+    """
+    from docker.utils.socket import frames_iter
+
+    api = container.client.api
+    exec_id = api.exec_create(container.id, ['tar', '-xf', '-', '-C', path], stdin=True)['Id']
+    sock = api.exec_start(exec_id, socket=True)
+    raw = getattr(sock, '_sock', sock)
+    try:
+        raw.sendall(archive)
+        raw.shutdown(socket.SHUT_WR)
+        output = b''.join(data for _, data in frames_iter(sock, tty=False))
+    finally:
+        raw.close()
+    if api.exec_inspect(exec_id)['ExitCode'] != 0:
+        raise docker.errors.DockerException(
+            f"Copying files into the sandbox failed: {output.decode('utf-8', errors='replace').strip()}")
+
+
+def copy_out(container, path):
+    """Tar of `path` (named by its basename) from a running sandbox"""
+    exit_code, (stdout, stderr) = container.exec_run(
+        ['tar', '-cf', '-', '-C', os.path.dirname(path), os.path.basename(path)], demux=True)
+    if exit_code != 0:
+        raise docker.errors.DockerException(
+            f"Copying {path} out of the sandbox failed: {(stderr or b'').decode('utf-8', errors='replace').strip()}")
+    return stdout or b''
+
+
+def put_files(container, files, path='/tmp'):
+    """Copy {name: str|bytes} into a running sandbox"""
+    stream = io.BytesIO()
+    with tarfile.open(fileobj=stream, mode='w') as tar:
+        for name, content in files.items():
+            data = content.encode('utf-8') if isinstance(content, str) else content
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = 0o644
+            info.mtime = time.time()
+            tar.addfile(info, io.BytesIO(data))
+    copy_in(container, stream.getvalue(), path)
+
+
+def start_sandbox(client, language, config, mem_limit='128m', scratch_mb=SANDBOX_SCRATCH_MB):
+    """Start an idle, locked-down container that executions are exec'd into"""
+    container = client.containers.run(
+        config['image'],
+        ['sleep', str(POOL_MAX_LIFETIME)],
+        detach=True,
+        auto_remove=True,
+        labels={POOL_LABEL: language},
+        mem_limit=mem_limit,
+        cpu_period=100000,
+        cpu_quota=50000,
+        pids_limit=64,
+        network_disabled=True,
+        security_opt=['no-new-privileges'],
+        # exec: compiled programs run from /tmp
+        tmpfs={'/tmp': f"rw,exec,nosuid,nodev,mode=1777,size={scratch_mb}m"},
+    )
+    return PooledContainer(language, container)
+
+
+def remove_sandbox(pooled):
+    try:
+        pooled.container.remove(force=True)
+    except docker.errors.APIError:
+        pass
+
+
+class PooledContainer:
+    def __init__(self, language, container):
+        self.language = language
+        self.container = container
+        self.started_at = time.time()
+        self.idle_since = self.started_at
+
+    def is_healthy(self):
+        # Leave headroom so a container never expires in the middle of a run
+        if time.time() - self.started_at > POOL_MAX_LIFETIME - 60:
+            return False
+        try:
+            self.container.reload()
+            return self.container.status == 'running'
+        except docker.errors.APIError:
+            return False
+
+    def exec(self, cmd, timeout=10, max_output=OUTPUT_MAX_BYTES, kill_on_overflow=True):
+        """Run cmd inside the container, returns (exit_code, capture, timed_out).
+
+        Output streams into an OutputCapture. Going over max_output kills the
+        container unless kill_on_overflow is False (other execs share it),
+        in which case the rest of the output is drained and dropped.
+        """
+        capture = OutputCapture(max_output, on_overflow=self.kill if kill_on_overflow else None)
+        api = self.container.client.api
+        result = {}
+
+        def target():
+            try:
+                exec_id = api.exec_create(self.container.id, cmd)['Id']
+                for stdout, stderr in api.exec_start(exec_id, stream=True, demux=True):
+                    if stdout:
+                        capture.feed('stdout', stdout)
+                    if stderr:
+                        capture.feed('stderr', stderr)
+                result['exit_code'] = api.exec_inspect(exec_id)['ExitCode']
+            except Exception as e:
+                result['error'] = e
+
+        worker = threading.Thread(target=target, daemon=True)
+        worker.start()
+        worker.join(timeout)
+
+        if worker.is_alive():
+            # Killing the container ends the exec; it is never reused anyway
+            self.kill()
+            return None, capture, True
+
+        if 'error' in result and not capture.truncated:
+            raise result['error']
+        return result.get('exit_code'), capture, False
+
+    def kill(self):
+        try:
+            self.container.kill()
+        except docker.errors.APIError:
+            pass
+
+
+class ContainerPool:
+    """Pre-started sandbox containers per language.
+
+    Every container serves exactly one execution and is then removed, so no
+    state leaks between users. A background thread keeps each language at its
+    minimum size, drops unhealthy containers and evicts the ones that sat idle
+    longer than POOL_IDLE_TIMEOUT.
+    """
+
+    def __init__(self, client, language_config):
+        self.client = client
+        self.language_config = language_config
+        self.idle = {language: deque() for language in language_config}
+        self.in_use = {language: 0 for language in language_config}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = False
+
+        self.maintainer = threading.Thread(target=self._maintain, daemon=True)
+        self.maintainer.start()
+
+    def _start_container(self, language):
+        return start_sandbox(self.client, language, self.language_config[language])
+
+    def _remove(self, pooled):
+        remove_sandbox(pooled)
+
+    def size(self, language):
+        return len(self.idle[language]) + self.in_use[language]
+
+    def acquire(self, language):
+        """Take a warm container, or start one if under max. None if exhausted."""
+        if language not in self.idle:
+            return None
+
+        min_size, max_size = pool_sizes(language, self.language_config[language])
+
+        while True:
+            with self.lock:
+                if self.idle[language]:
+                    pooled = self.idle[language].popleft()
+                    self.in_use[language] += 1
+                elif self.size(language) < max_size:
+                    pooled = None
+                    self.in_use[language] += 1
+                else:
+                    return None
+
+            if pooled is None:
+                try:
+                    pooled = self._start_container(language)
+                except Exception:
+                    with self.lock:
+                        self.in_use[language] -= 1
+                    raise
+            elif not pooled.is_healthy():
+                self._remove(pooled)
+                with self.lock:
+                    self.in_use[language] -= 1
+                continue
+
+            self.wakeup.set()
+            return pooled
+
+    def release(self, pooled):
+        """Recycle a container after its single execution"""
+        self._remove(pooled)
+        with self.lock:
+            self.in_use[pooled.language] -= 1
+        self.wakeup.set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                language: {"idle": len(self.idle[language]), "in_use": self.in_use[language]}
+                for language in self.language_config
+            }
+
+    def shutdown(self):
+        self.stopped = True
+        self.wakeup.set()
+        with self.lock:
+            leftovers = [pooled for queue in self.idle.values() for pooled in queue]
+            for queue in self.idle.values():
+                queue.clear()
+        for pooled in leftovers:
+            self._remove(pooled)
+
+    def _maintain(self):
+        while not self.stopped:
+            for language, config in self.language_config.items():
+                try:
+                    self._maintain_language(language, config)
+                except Exception as e:
+                    print(f"Container pool maintenance error ({language}): {e}")
+            self.wakeup.wait(POOL_CHECK_INTERVAL)
+            self.wakeup.clear()
+
+    def _maintain_language(self, language, config):
+        min_size, max_size = pool_sizes(language, config)
+        now = time.time()
+
+        # Health check, and shrink back to the minimum once a burst is over
+        with self.lock:
+            candidates = list(self.idle[language])
+        surplus = len(candidates) - min_size
+        for pooled in candidates:
+            expired = surplus > 0 and now - pooled.idle_since > POOL_IDLE_TIMEOUT
+            if expired or not pooled.is_healthy():
+                surplus -= 1
+                with self.lock:
+                    try:
+                        self.idle[language].remove(pooled)
+                    except ValueError:
+                        continue  # Acquired in the meantime
+                self._remove(pooled)
+
+        # Refill up to the minimum
+        while not self.stopped:
+            with self.lock:
+                if len(self.idle[language]) >= min_size or self.size(language) >= max_size:
+                    return
+            pooled = self._start_container(language)
+            with self.lock:
+                self.idle[language].append(pooled)
+
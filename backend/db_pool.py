@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+from metrics import observe_query
+
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_IDLE_TIMEOUT = int(os.getenv('DB_POOL_IDLE_TIMEOUT', '300'))
+DB_POOL_CHECKOUT_TIMEOUT = int(os.getenv('DB_POOL_CHECKOUT_TIMEOUT', '10'))
+# Connections idle for longer than this are pinged before being handed out;
+# Neon suspends idle computes and drops their connections
+DB_POOL_HEALTH_CHECK_AFTER = int(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '5'))
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class TimedCursor(psycopg2.extensions.cursor):
+    """Cursor that reports each statement's latency to /metrics"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            statement = query.decode('utf-8', 'replace') if isinstance(query, bytes) else str(query)
+            observe_query(statement, time.perf_counter() - started)
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool shared by all request threads.
+
+    Connections are recreated after a fork (gunicorn preload), closed once
+    they sit idle longer than idle_timeout, and pinged on checkout when they
+    have been idle long enough that the server may have dropped them. Each
+    process's first checkout opens min_size connections in the background,
+    and idle expiry never shrinks the pool below that.
+    """
+
+    def __init__(self, dsn, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 idle_timeout=DB_POOL_IDLE_TIMEOUT, checkout_timeout=DB_POOL_CHECKOUT_TIMEOUT,
+                 cursor_factory=None):
+        self.dsn = dsn
+        self.cursor_factory = cursor_factory
+        self.min_size = min_size
+        self.max_size = max(min_size, max_size)
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.idle = []  # (connection, returned_at), most recently used last
+        self.size = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.warmed = False
+        self.created = 0
+        self.closed = 0
+        self.health_check_failures = 0
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=self.cursor_factory)
+        with self.cond:
+            self.created += 1
+        return conn
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self.cond:
+            self.closed += 1
+
+    def _is_healthy(self, conn, idle_for):
+        if conn.closed:
+            return False
+        if idle_for < DB_POOL_HEALTH_CHECK_AFTER:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        deadline = time.time() + self.checkout_timeout
+        expired = []
+        try:
+            with self.cond:
+                conn, returned_at = self._checkout(deadline, expired)
+        finally:
+            # Closing is a round trip to the server, done outside the lock
+            for idle_conn in expired:
+                self._close(idle_conn)
+
+        try:
+            if conn is not None and not self._is_healthy(conn, time.time() - returned_at):
+                self._close(conn)
+                with self.cond:
+                    self.health_check_failures += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self.cond:
+                self.size -= 1
+                self.in_use -= 1
+                self.cond.notify()
+            raise
+        return conn
+
+    def _checkout(self, deadline, expired):
+        """Reserve an idle connection, or room for a new one (conn None);
+        called with the lock held, idle connections past their timeout are
+        moved to expired for the caller to close"""
+        if self.pid != os.getpid():
+            # Inherited from the parent process, the sockets are not ours
+            self._reset()
+        if not self.warmed:
+            self.warmed = True
+            threading.Thread(target=self.warm, daemon=True).start()
+
+        while True:
+            expired.extend(self._expire_idle())
+            if self.idle:
+                conn, returned_at = self.idle.pop()
+                self.in_use += 1
+                return conn, returned_at
+            if self.size < self.max_size:
+                self.size += 1
+                self.in_use += 1
+                return None, None
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise PoolTimeout(f"No database connection available within {self.checkout_timeout}s")
+            self.waiting += 1
+            self.cond.wait(remaining)
+            self.waiting -= 1
+
+    def warm(self):
+        """Open connections until the pool holds min_size"""
+        while True:
+            with self.cond:
+                if self.pid != os.getpid() or self.size >= self.min_size:
+                    return
+                self.size += 1
+            try:
+                conn = self._connect()
+            except psycopg2.Error as e:
+                print(f"Database pool warm-up failed: {e}")
+                with self.cond:
+                    self.size -= 1
+                    self.cond.notify()
+                return
+            with self.cond:
+                self.idle.append((conn, time.time()))
+                self.cond.notify()
+
+    def putconn(self, conn, discard=False):
+        if self.pid != os.getpid():
+            return
+
+        # Round trips to the server happen outside the lock, so a slow
+        # rollback never holds up other checkouts
+        if not discard and not conn.closed:
+            try:
+                conn.rollback()  # Never hand out a connection mid-transaction
+            except psycopg2.Error:
+                discard = True
+        discard = discard or conn.closed
+        if discard:
+            self._close(conn)
+
+        with self.cond:
+            self.in_use -= 1
+            if discard:
+                self.size -= 1
+            else:
+                self.idle.append((conn, time.time()))
+            self.cond.notify()
+
+    def _expire_idle(self):
+        """Remove idle connections past idle_timeout (keeping min_size), the
+        caller closes the returned connections once it releases the lock"""
+        cutoff = time.time() - self.idle_timeout
+        expired = []
+        while self.idle and self.size > self.min_size and self.idle[0][1] < cutoff:
+            conn, _ = self.idle.pop(0)
+            expired.append(conn)
+            self.size -= 1
+        return expired
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Dropped serverless connection: throw it away, next checkout reconnects
+            self.putconn(conn, discard=True)
+            raise
+        except Exception:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def stats(self):
+        with self.cond:
+            return {
+                "size": self.size,
+                "idle": len(self.idle),
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "created": self.created,
+                "closed": self.closed,
+                "health_check_failures": self.health_check_failures,
+                "min_size": self.min_size,
+                "max_size": self.max_size
+            }
+
+    def closeall(self):
+        with self.cond:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+        for conn, _ in idle:
+            self._close(conn)
@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+
+import docker
+from urllib3.util.retry import Retry
+
+from metrics import instrument_docker_client
+
+# Keep-alive connections to the Docker socket, one per concurrent request
+# thread is enough (gunicorn --threads, job queue workers, pool maintainer)
+DOCKER_MAX_POOL_SIZE = int(os.getenv('DOCKER_MAX_POOL_SIZE', '16'))
+DOCKER_TIMEOUT = int(os.getenv('DOCKER_TIMEOUT', '60'))
+DOCKER_RETRIES = int(os.getenv('DOCKER_RETRIES', '3'))
+DOCKER_PULL_ON_STARTUP = os.getenv('DOCKER_PULL_ON_STARTUP', 'true').lower() == 'true'
+# Written by docker/runtimes/build.py: runtime image tag -> digest (or image ID)
+RUNTIME_IMAGES_FILE = os.getenv(
+    'RUNTIME_IMAGES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'runtime-images.json'))
+# A language whose image is missing is re-checked at most this often
+IMAGE_RECHECK_INTERVAL = int(os.getenv('IMAGE_RECHECK_INTERVAL', '30'))
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+# image reference -> image ID, once the image is known to be present
+pinned_images = {}
+# image reference -> when it was last found missing
+missing_images = {}
+
+
+def _retry_policy():
+    # Connection errors are retried for every method (nothing reached the
+    # daemon yet); read errors only for idempotent requests, so a container
+    # create is never sent twice
+    return Retry(total=DOCKER_RETRIES, connect=DOCKER_RETRIES, read=DOCKER_RETRIES,
+                 status=0, backoff_factor=0.1, raise_on_status=False)
+
+
+def get_client():
+    """Process-wide Docker client, rebuilt after a fork (gunicorn preload).
+
+    The underlying requests session keeps up to DOCKER_MAX_POOL_SIZE
+    connections to the daemon alive between requests.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            # An inherited client shares its sockets with the parent; drop it
+            # without closing them
+            client = docker.from_env(max_pool_size=DOCKER_MAX_POOL_SIZE, timeout=DOCKER_TIMEOUT)
+            for adapter in client.api.adapters.values():
+                adapter.max_retries = _retry_policy()
+            _client = instrument_docker_client(client)
+            _client_pid = pid
+    return _client
+
+
+def ensure_images(images):
+    """Pull any missing image and pin tag -> image ID, returns the pins"""
+    try:
+        client = get_client()
+    except Exception as e:
+        print(f"Docker unavailable, skipping image pulls: {e}")
+        return {}
+    for image in sorted(set(images)):
+        try:
+            try:
+                resolved = client.images.get(image)
+            except docker.errors.ImageNotFound:
+                print(f"Pulling {image}...")
+                resolved = client.images.pull(image)
+            pinned_images[image] = resolved.id
+            missing_images.pop(image, None)
+        except Exception as e:
+            missing_images[image] = time.time()
+            print(f"Could not prepare image {image}: {e}")
+    return dict(pinned_images)
+
+
+def image_available(image):
+    """Whether the image is present locally; languages without one are refused"""
+    if image in pinned_images:
+        return True
+    checked_at = missing_images.get(image)
+    if checked_at and time.time() - checked_at < IMAGE_RECHECK_INTERVAL:
+        return False
+    try:
+        pinned_images[image] = get_client().images.get(image).id
+        missing_images.pop(image, None)
+        return True
+    except Exception:
+        missing_images[image] = time.time()
+        return False
+
+
+def load_image_lock(path=RUNTIME_IMAGES_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def pin_language_images(language_config, lock=None):
+    """Point each language at the digest recorded for its runtime image tag"""
+    lock = load_image_lock() if lock is None else lock
+    for config in language_config.values():
+        config['image'] = lock.get(config['image'], config['image'])
+    return language_config
+
+
+def prefetch_images(language_config):
+    """Pull the images in LANGUAGE_CONFIG in the background at startup"""
+    if not DOCKER_PULL_ON_STARTUP:
+        return None
+    images = [config['image'] for config in language_config.values()]
+    thread = threading.Thread(target=ensure_images, args=(images,), daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,566 @@
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+
+from capture import output_limit_message
+from sandbox import COMPILE_LIMITS, SANDBOX_ENABLED, run_sandboxed
+from telemetry import phase
+
+# Isolation levels, weakest first. A language's policy is the weakest level
+# it may run at; the router picks the cheapest backend that meets it.
+ISOLATION_LEVELS = ['none', 'process', 'container']
+
+
+def parse_isolation_policy(value=None, default='container'):
+    """Parse EXECUTOR_ISOLATION, e.g. "container" or "process,java=container"
+
+    A bare level sets the default for every language.
+    """
+    value = value if value is not None else os.getenv('EXECUTOR_ISOLATION', '')
+    policy = {'*': default}
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        language, _, level = item.rpartition('=')
+        if level not in ISOLATION_LEVELS:
+            raise ValueError(f"Unknown isolation level: {level}")
+        policy[language.strip() or '*'] = level
+    return policy
+
+
+class ExecutionResult:
+    """Outcome of one execution, whichever backend ran it.
+
+    error is None for a successful run, otherwise the message shown to the
+    user (compiler output, stderr, timeout). usage is {cpu_ms, max_rss_kb}
+    when the backend can measure it. truncated runs printed more than
+    capture.OUTPUT_MAX_BYTES and were stopped, output_bytes is what they
+    printed before that. compile_output holds compiler diagnostics where the
+    backend keeps them apart from the program's output.
+    """
+
+    def __init__(self, stdout='', stderr='', exit_code=None, error=None, timed_out=False,
+                 timings=None, usage=None, backend=None, truncated=False, output_bytes=0, compile_output=None):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.exit_code = exit_code
+        self.error = error
+        self.timed_out = timed_out
+        self.truncated = truncated
+        self.output_bytes = output_bytes
+        self.compile_output = compile_output
+        self.timings = timings if timings is not None else {}
+        self.usage = usage
+        self.backend = backend
+
+    @classmethod
+    def failure(cls, error, **kwargs):
+        return cls(error=error, **kwargs)
+
+    @classmethod
+    def from_capture(cls, exit_code, capture, timed_out, stderr=None, **kwargs):
+        """Result of a run captured with capture.OutputCapture, stderr
+        overrides the captured one (e.g. with runner markers removed)"""
+        stdout = capture.stdout
+        stderr = capture.stderr if stderr is None else stderr
+        error = None
+        if capture.truncated:
+            error = output_limit_message(capture.max_bytes)
+        elif timed_out:
+            error = "Execution timeout (10s limit)"
+        elif exit_code != 0:
+            error = stderr or f"Exited with code {exit_code}"
+        return cls(stdout, stderr, exit_code, error, timed_out, truncated=capture.truncated,
+                   output_bytes=capture.output_bytes, **kwargs)
+
+    def to_response(self):
+        """The {"output", "error"} body of /api/run, plus the truncation flag.
+        Truncated output is still returned, up to the cap."""
+        response = {
+            "output": self.stdout if self.error is None or self.truncated else "",
+            "error": self.error,
+            "truncated": self.truncated,
+            "output_bytes": self.output_bytes
+        }
+        if self.compile_output is not None:
+            response["compile_output"] = self.compile_output
+        return response
+
+
+class Executor:
+    """A way of running code. Subclasses set name, cost and isolation."""
+
+    name = None
+    # Relative cost of one run, the router prefers the cheapest backend
+    cost = 0
+    isolation = 'none'
+
+    def __init__(self, language_config):
+        self.language_config = language_config
+
+    def supports(self, language):
+        return language in self.language_config
+
+    def unavailable(self, language):
+        """Why the language can't run on this backend right now, or None"""
+        return None
+
+    def run(self, language, code, input_data="", timings=None):
+        raise NotImplementedError
+
+
+class ExecutorRouter:
+    """Send each language to the cheapest backend meeting its isolation policy"""
+
+    def __init__(self, backends, policy=None):
+        self.backends = sorted(backends, key=lambda backend: backend.cost)
+        self.policy = policy if policy is not None else parse_isolation_policy()
+
+    def required_isolation(self, language):
+        return self.policy.get(language, self.policy['*'])
+
+    def backend_for(self, language):
+        """The cheapest allowed backend that can run the language now, else the
+        cheapest allowed one at all (its run() reports why it can't)"""
+        required = ISOLATION_LEVELS.index(self.required_isolation(language))
+        allowed = [
+            backend for backend in self.backends
+            if ISOLATION_LEVELS.index(backend.isolation) >= required and backend.supports(language)
+        ]
+        for backend in allowed:
+            if backend.unavailable(language) is None:
+                return backend
+        return allowed[0] if allowed else None
+
+    def supports(self, language):
+        return self.backend_for(language) is not None
+
+    def unavailable(self, language):
+        backend = self.backend_for(language)
+        if backend is None:
+            return "Unsupported language"
+        return backend.unavailable(language)
+
+    def run(self, language, code, input_data="", timings=None):
+        timings = timings if timings is not None else {}
+        backend = self.backend_for(language)
+        if backend is None:
+            return ExecutionResult.failure("Unsupported language", timings=timings)
+        return backend.run(language, code, input_data, timings)
+
+
+# Compiles and runs in one container for DockerExecutor.run_single_container.
+# Compiler output (first 64KB) goes to stderr ahead of a marker line with the
+# compiler's exit status and duration; an empty compile command skips the
+# compile (the artifact came from the cache). The program runs under
+# ulimit -v with stdin from /tmp/input.txt.
+# Usage: sh -c COMPILE_AND_RUN sh <compile s> <run s> <run memory KB> <compile cmd> <run cmd>
+# Either command may be empty to only compile or only run.
+COMPILE_AND_RUN = r'''
+if [ -n "$4" ]; then
+  started=$(date +%s%N)
+  timeout -k 1 "$1" sh -c "$4" > /tmp/compile.log 2>&1
+  status=$?
+  head -c 65536 /tmp/compile.log >&2
+  printf '\n__RC_COMPILED__ %s %s\n' "$status" $(( ($(date +%s%N) - started) / 1000000 )) >&2
+  [ "$status" -eq 0 ] || exit "$status"
+fi
+[ -n "$5" ] || exit 0
+ulimit -v "$3"
+timeout -k 1 "$2" sh -c "$5" < /tmp/input.txt
+status=$?
+[ "$status" -eq 124 ] && printf '\n__RC_TIMEOUT__\n' >&2
+exit "$status"
+'''
+COMPILE_MARKER = '\n__RC_COMPILED__ '
+RUN_TIMEOUT_MARKER = '\n__RC_TIMEOUT__\n'
+
+
+def split_compile_output(stderr):
+    """Split COMPILE_AND_RUN's stderr, returns (compile output, compile
+    status, compile ms, program stderr); status and ms are None when no
+    compile finished"""
+    head, marker, rest = stderr.partition(COMPILE_MARKER)
+    if not marker:
+        return None, None, None, stderr
+    line, _, rest = rest.partition('\n')
+    status, compile_ms = (int(value) for value in line.split())
+    return head, status, compile_ms, rest
+
+
+def compile_failure(capture):
+    """Compiler diagnostics from a captured compile"""
+    diagnostics = capture.stderr or capture.stdout
+    if capture.truncated:
+        return f"{diagnostics}\n{output_limit_message(capture.max_bytes)}"
+    return diagnostics
+
+
+def source_file(language, config):
+    if 'source_file' in config:
+        return config['source_file']
+    return 'Main.java' if language == 'java' else f"code{config['extension']}"
+
+
+class DockerExecutor(Executor):
+    """Runs in the language's runtime image: a warm pooled container when one
+    is free, a fresh one otherwise. Sources, input and build output live on
+    the sandbox's tmpfs /tmp (container_pool.SANDBOX_SCRATCH_MB).
+
+    pool and compile_servers are callables returning the (lazily created)
+    ContainerPool / CompileServers or None; compile_cache may be None.
+    """
+
+    name = 'docker'
+    cost = 3
+    isolation = 'container'
+
+    def __init__(self, language_config, pool=None, compile_cache=None, compile_servers=None):
+        super().__init__(language_config)
+        self.pool = pool or (lambda: None)
+        self.compile_cache = compile_cache
+        self.compile_servers = compile_servers or (lambda: None)
+
+    def unavailable(self, language):
+        from docker_client import image_available
+
+        if image_available(self.language_config[language]['image']):
+            return None
+        return f"{language} is temporarily unavailable: its runtime image is missing"
+
+    def server_compile(self, language, code, timings):
+        """Compile with a resident compiler, returns the artifact archive or None
+        when there is no compile server for the language (raises CompileError)"""
+        from compile_server import CompileError
+
+        if 'compile_server' not in self.language_config[language]:
+            return None
+        try:
+            servers = self.compile_servers()
+            if not servers:
+                return None
+            with phase(timings, 'compile_ms'):
+                return servers.compile(language, code)
+        except CompileError:
+            raise
+        except Exception as e:
+            print(f"Compile server unavailable, falling back to {language} compile_cmd: {e}")
+            return None
+
+    def cached_artifact(self, language, code, timings):
+        """(cache key, artifact archive or None) from the compile cache or a compile server"""
+        from compile_cache import CompileCache
+
+        config = self.language_config[language]
+        cache_key = CompileCache.key(language, config, code) if self.compile_cache else None
+        artifact = self.compile_cache.get(cache_key) if self.compile_cache else None
+        timings['compile_cache_hit'] = artifact is not None
+        if artifact is None:
+            artifact = self.server_compile(language, code, timings)
+            if artifact is not None and self.compile_cache:
+                self.compile_cache.put(cache_key, artifact)
+        return cache_key, artifact
+
+    def prepare_pooled(self, pooled, language, code, input_data="", timings=None):
+        """Copy the source into a warm container and compile it, returns an error or None"""
+        from compile_server import CompileError
+        from container_pool import copy_in, copy_out, put_files
+
+        config = self.language_config[language]
+        timings = timings if timings is not None else {}
+        put_files(pooled.container, {
+            source_file(language, config): code,
+            'input.txt': input_data or ''
+        })
+
+        if 'compile_cmd' not in config:
+            return None
+
+        try:
+            cache_key, artifact = self.cached_artifact(language, code, timings)
+        except CompileError as e:
+            return str(e)
+        if artifact is not None:
+            copy_in(pooled.container, artifact, os.path.dirname(config['artifact']))
+            return None
+
+        with phase(timings, 'compile_ms'):
+            exit_code, capture, timed_out = pooled.exec(config['compile_cmd'], timeout=15)
+        if timed_out:
+            return "Compilation timeout (15s limit)"
+        if exit_code != 0 or capture.truncated:
+            return compile_failure(capture)
+        if self.compile_cache:
+            self.compile_cache.put(cache_key, copy_out(pooled.container, config['artifact']))
+        return None
+
+    def run_pooled(self, pooled, language, code, input_data="", timings=None):
+        """Compile and run inside a warm container using exec"""
+        config = self.language_config[language]
+        timings = timings if timings is not None else {}
+        error = self.prepare_pooled(pooled, language, code, input_data, timings)
+        if error:
+            return ExecutionResult.failure(error, timings=timings, backend=self.name)
+
+        run_cmd = ['sh', '-c', f"{shlex.join(config['run_cmd'])} < /tmp/input.txt"]
+        with phase(timings, 'run_ms'):
+            exit_code, capture, timed_out = pooled.exec(run_cmd, timeout=10)
+        timings['exit_code'] = exit_code
+        return ExecutionResult.from_capture(exit_code, capture, timed_out, timings=timings, backend=self.name)
+
+    def run_single_container(self, language, code, input_data="", timings=None):
+        """Compile and run in one fresh sandbox (config 'single_container').
+
+        The compile gets its own time budget; the program then runs with its
+        own, shorter one and a tighter address space limit. Compiler output
+        is reported apart from the program's. A build that goes into the
+        compile cache is copied out before the program runs, in a second
+        exec, so the program can't tamper with what other runs reuse.
+        """
+        from container_pool import copy_in, copy_out, put_files, remove_sandbox, start_sandbox
+        from docker_client import get_client
+
+        config = self.language_config[language]
+        single = config['single_container']
+        timings = timings if timings is not None else {}
+        compile_timeout = single.get('compile_timeout', 15)
+        run_timeout = single.get('run_timeout', 10)
+        cache_key, artifact = self.cached_artifact(language, code, timings)
+        compile_cmd = '' if artifact is not None else shlex.join(config['compile_cmd'])
+        run_cmd = shlex.join(config['run_cmd'])
+        cache_build = artifact is None and self.compile_cache is not None and 'artifact' in config
+
+        def script(compile_cmd, run_cmd):
+            return ['sh', '-c', COMPILE_AND_RUN, 'sh', str(compile_timeout), str(run_timeout),
+                    str(single.get('run_memory_mb', 128) * 1024), compile_cmd, run_cmd]
+
+        with phase(timings, 'container_start_ms'):
+            sandbox = start_sandbox(get_client(), language, config, mem_limit=single.get('mem_limit', '512m'))
+        try:
+            with phase(timings, 'container_start_ms'):
+                put_files(sandbox.container, {source_file(language, config): code, 'input.txt': input_data or ''})
+                if artifact is not None:
+                    copy_in(sandbox.container, artifact, os.path.dirname(config['artifact']))
+            with phase(timings, 'run_ms'):
+                if cache_build:
+                    exit_code, capture, timed_out = sandbox.exec(script(compile_cmd, ''), timeout=compile_timeout + 5)
+                else:
+                    exit_code, capture, timed_out = sandbox.exec(script(compile_cmd, run_cmd),
+                                                                 timeout=compile_timeout + run_timeout + 5)
+
+            compile_output, compile_status, compile_ms, stderr = split_compile_output(capture.stderr)
+            if compile_ms is not None:
+                timings['compile_ms'] = compile_ms
+                timings['run_ms'] = max(0, timings['run_ms'] - compile_ms)
+
+            if artifact is None and compile_status != 0:
+                if compile_status == 124 or (compile_status is None and not capture.truncated):
+                    error = f"Compilation timeout ({compile_timeout}s limit)"
+                elif compile_status is None:
+                    error = compile_failure(capture)
+                else:
+                    error = compile_output
+                return ExecutionResult.failure(error, compile_output=compile_output, timings=timings,
+                                               backend=self.name)
+            if cache_build:
+                self.compile_cache.put(cache_key, copy_out(sandbox.container, config['artifact']))
+                with phase(timings, 'run_ms'):
+                    exit_code, capture, timed_out = sandbox.exec(script('', run_cmd), timeout=run_timeout + 5)
+                stderr = capture.stderr
+
+            if stderr.endswith(RUN_TIMEOUT_MARKER):
+                stderr, timed_out, exit_code = stderr[:-len(RUN_TIMEOUT_MARKER)], True, None
+            timings['exit_code'] = exit_code
+            return ExecutionResult.from_capture(exit_code, capture, timed_out, stderr=stderr, timings=timings,
+                                                backend=self.name, compile_output=compile_output)
+        finally:
+            remove_sandbox(sandbox)
+
+    def run_cold(self, language, code, input_data="", timings=None):
+        """Compile and run in a fresh sandbox, the way a pooled one is used"""
+        from container_pool import remove_sandbox, start_sandbox
+        from docker_client import get_client
+
+        timings = timings if timings is not None else {}
+        with phase(timings, 'container_start_ms'):
+            sandbox = start_sandbox(get_client(), language, self.language_config[language])
+        try:
+            return self.run_pooled(sandbox, language, code, input_data, timings)
+        finally:
+            with phase(timings, 'teardown_ms'):
+                remove_sandbox(sandbox)
+
+    def run(self, language, code, input_data="", timings=None):
+        """Phase durations (see telemetry.PHASES), the exit code and compile
+        cache hits are added to `timings` when a dict is passed in."""
+        timings = timings if timings is not None else {}
+        if not self.supports(language):
+            return ExecutionResult.failure("Unsupported language", timings=timings)
+        unavailable = self.unavailable(language)
+        if unavailable:
+            return ExecutionResult.failure(unavailable, timings=timings, backend=self.name)
+
+        pool = None
+        pooled = None
+        try:
+            pool = self.pool()
+            if pool:
+                with phase(timings, 'container_start_ms'):
+                    pooled = pool.acquire(language)
+        except Exception as e:
+            print(f"Container pool unavailable, falling back to one-shot container: {e}")
+        if pooled:
+            try:
+                return self.run_pooled(pooled, language, code, input_data, timings)
+            except Exception as e:
+                return ExecutionResult.failure(str(e), timings=timings, backend=self.name)
+            finally:
+                with phase(timings, 'teardown_ms'):
+                    pool.release(pooled)
+
+        try:
+            if 'single_container' in self.language_config[language]:
+                return self.run_single_container(language, code, input_data, timings)
+            return self.run_cold(language, code, input_data, timings)
+        except Exception as e:
+            return ExecutionResult.failure(str(e), timings=timings, backend=self.name)
+
+
+# Local toolchains shared by the subprocess and sandbox backends.
+# sandbox overrides sandbox.RUN_LIMITS: the JVM needs more memory and threads.
+LOCAL_LANGUAGE_CONFIG = {
+    'python': {
+        'run_cmd': ['python'],
+        'extension': '.py'
+    },
+    'javascript': {
+        'run_cmd': ['node'],
+        'extension': '.js'
+    },
+    'c': {
+        'compile_cmd': ['gcc', '-o'],
+        'extension': '.c'
+    },
+    'cpp': {
+        'compile_cmd': ['g++', '-o'],
+        'extension': '.cpp'
+    },
+    'java': {
+        'compile_cmd': ['javac'],
+        'run_cmd': ['java'],
+        'extension': '.java',
+        'sandbox': {'memory_mb': 512, 'processes': 128}
+    }
+}
+
+MISSING_TOOLCHAIN = {
+    'c': "C/C++ compiler not found. Please install MinGW or GCC.",
+    'cpp': "C/C++ compiler not found. Please install MinGW or GCC.",
+    'java': "Java compiler not found. Please install JDK.",
+}
+
+
+class LocalExecutor(Executor):
+    """Runs the host's own toolchains as plain subprocesses (development only)"""
+
+    name = 'local'
+    cost = 1
+    isolation = 'none'
+    sandboxed = False
+
+    def __init__(self, language_config=None):
+        super().__init__(language_config or LOCAL_LANGUAGE_CONFIG)
+
+    def unavailable(self, language):
+        config = self.language_config[language]
+        if shutil.which((config.get('compile_cmd') or config['run_cmd'])[0]):
+            return None
+        return MISSING_TOOLCHAIN.get(language, f"{language} is not installed on this host")
+
+    def limits(self, language):
+        return self.language_config[language].get('sandbox')
+
+    def _run(self, cmd, input_data=None, cwd=None, limits=None):
+        return run_sandboxed(cmd, input=input_data, text=True, cwd=cwd, timeout=10, limits=limits,
+                             isolate=self.sandboxed)
+
+    def prepare(self, language, code, work_dir, timings=None):
+        """Write and compile the source in work_dir, returns (run command, error)"""
+        config = self.language_config[language]
+        timings = timings if timings is not None else {}
+
+        # Sources always go through a file: argv is limited by ARG_MAX
+        path = os.path.join(work_dir, source_file(language, config))
+        with open(path, 'w') as f:
+            f.write(code)
+
+        if 'compile_cmd' not in config:
+            return config['run_cmd'] + [path], None
+
+        if language == 'java':
+            compile_cmd = config['compile_cmd'] + [path]
+            run_cmd = config['run_cmd'] + ['-cp', work_dir, 'Main']
+        else:
+            exe_path = os.path.join(work_dir, 'program.exe')
+            compile_cmd = config['compile_cmd'] + [exe_path, path]
+            run_cmd = [exe_path]
+
+        with phase(timings, 'compile_ms'):
+            compiled = self._run(compile_cmd, cwd=work_dir, limits=COMPILE_LIMITS)
+        if compiled.returncode != 0:
+            return None, f"Compilation Error: {compiled.stderr}"
+        return run_cmd, None
+
+    def run(self, language, code, input_data="", timings=None):
+        timings = timings if timings is not None else {}
+        if not self.supports(language):
+            return ExecutionResult.failure("Unsupported language", timings=timings)
+        unavailable = self.unavailable(language)
+        if unavailable:
+            return ExecutionResult.failure(unavailable, timings=timings, backend=self.name)
+
+        work_dir = tempfile.mkdtemp()
+        try:
+            cmd, error = self.prepare(language, code, work_dir, timings)
+            if error:
+                return ExecutionResult.failure(error, timings=timings, backend=self.name)
+            with phase(timings, 'run_ms'):
+                completed = self._run(cmd, input_data, cwd=work_dir, limits=self.limits(language))
+        except subprocess.TimeoutExpired:
+            return ExecutionResult.failure("Execution timeout (10s limit)", timed_out=True, timings=timings,
+                                           backend=self.name)
+        except FileNotFoundError as e:
+            return ExecutionResult.failure(MISSING_TOOLCHAIN.get(language, str(e)), timings=timings,
+                                           backend=self.name)
+        except Exception as e:
+            return ExecutionResult.failure(str(e), timings=timings, backend=self.name)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        timings['exit_code'] = completed.returncode
+        error = None
+        if completed.returncode != 0 or completed.truncated:
+            error = completed.stderr or f"Exited with code {completed.returncode}"
+        return ExecutionResult(
+            stdout=completed.stdout,
+            stderr=completed.stderr,
+            exit_code=completed.returncode,
+            error=error,
+            timings=timings,
+            usage=completed.usage,
+            backend=self.name,
+            truncated=completed.truncated,
+            output_bytes=completed.output_bytes
+        )
+
+
+class SandboxExecutor(LocalExecutor):
+    """Local toolchains under sandbox.py's rlimits, cgroup and namespaces"""
+
+    name = 'sandbox'
+    cost = 2
+    isolation = 'process' if SANDBOX_ENABLED else 'none'
+    sandboxed = True
@@ -0,0 +1,41 @@
+# Production launch profile for the asyncio server (asgi.py):
+#
+#   gunicorn -c gunicorn_asgi.conf.py asgi:app
+#
+# A handful of uvicorn worker processes, each with its own event loop,
+# container pool and execution threads (ASGI_EXECUTION_THREADS). Pending
+# runs and WebSocket streams are coroutines, so a worker holds thousands of
+# them; concurrency is bounded by the pool sizes, not by the worker count.
+import multiprocessing
+import os
+
+from uvicorn.workers import UvicornWorker
+
+from request_limits import MAX_BODY_BYTES
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', str(min(4, multiprocessing.cpu_count()))))
+# Long enough for a compile plus a run; a worker blocked past this is restarted
+timeout = int(os.getenv('WORKER_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('KEEPALIVE', '5'))
+backlog = int(os.getenv('BACKLOG', '2048'))
+# Recycle workers now and then, with jitter so they don't all restart at once
+max_requests = int(os.getenv('MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+accesslog = '-'
+
+
+class Worker(UvicornWorker):
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        'loop': 'uvloop',
+        'http': 'httptools',
+        'ws': 'websockets',
+        # Same cap as the Flask server's SOCK_SERVER_OPTIONS
+        'ws_max_size': MAX_BODY_BYTES,
+        'timeout_keep_alive': keepalive,
+    }
+
+
+worker_class = Worker
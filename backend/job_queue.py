@@ -0,0 +1,290 @@
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '4'))
+JOB_MAX_PENDING = int(os.getenv('JOB_MAX_PENDING', '200'))
+JOB_RESULT_TTL = int(os.getenv('JOB_RESULT_TTL', '600'))
+JOB_DEFAULT_LANGUAGE_LIMIT = int(os.getenv('JOB_DEFAULT_LANGUAGE_LIMIT', '4'))
+# A Redis worker holds a language slot under a lease of this many seconds,
+# longer than any execution can take: a worker that dies mid-job gives its
+# slot back when the lease runs out
+JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '300'))
+
+# KEYS[1] running set; ARGV now, limit, lease expiry, job id. Returns 1 when
+# the job got a slot.
+CLAIM_SLOT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[4])
+return 1
+"""
+
+
+def parse_language_limits(value=None):
+    """Parse JOB_LANGUAGE_LIMITS, e.g. "python=8,java=2" """
+    value = value if value is not None else os.getenv('JOB_LANGUAGE_LIMITS', '')
+    limits = {}
+    for item in value.split(','):
+        if '=' in item:
+            language, limit = item.split('=', 1)
+            limits[language.strip()] = int(limit)
+    return limits
+
+
+class QueueFull(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Execution queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def new_job(language, code, input_data):
+    return {
+        "id": str(uuid.uuid4()),
+        "status": "queued",
+        "language": language,
+        "code": code,
+        "input": input_data,
+        "result": None,
+        "submitted_at": time.time(),
+        "started_at": None,
+        "finished_at": None
+    }
+
+
+def job_view(job):
+    """Public representation of a job, without the submitted source"""
+    return {key: value for key, value in job.items() if key not in ('code', 'input')}
+
+
+class DurationEstimate:
+    """Moving average of execution time, used for Retry-After hints"""
+
+    def __init__(self, initial=2.0, weight=0.2):
+        self.value = initial
+        self.weight = weight
+
+    def record(self, seconds):
+        self.value = (1 - self.weight) * self.value + self.weight * seconds
+
+    def retry_after(self, pending, workers):
+        return max(1, math.ceil(pending * self.value / max(1, workers)))
+
+
+def run_job(execute, job):
+    started = time.time()
+    timings = {'queue_wait_ms': int((started - job['submitted_at']) * 1000)}
+    try:
+        result = execute(job['language'], job['code'], job['input'], timings)
+        job['status'] = 'done'
+    except Exception as e:
+        result = {"output": "", "error": str(e)}
+        job['status'] = 'failed'
+    job['result'] = result
+    job['started_at'] = started
+    job['finished_at'] = time.time()
+    return job['finished_at'] - started
+
+
+class LocalJobQueue:
+    """In-process queue and worker threads for single-node deployments"""
+
+    def __init__(self, execute, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING,
+                 language_limits=None, result_ttl=JOB_RESULT_TTL):
+        self.execute = execute
+        self.workers = workers
+        self.max_pending = max_pending
+        self.language_limits = language_limits if language_limits is not None else parse_language_limits()
+        self.result_ttl = result_ttl
+
+        self.pending = defaultdict(deque)  # language -> queued jobs
+        self.running = defaultdict(int)
+        self.jobs = {}
+        self.estimate = DurationEstimate()
+        self.cond = threading.Condition()
+
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def limit(self, language):
+        return self.language_limits.get(language, JOB_DEFAULT_LANGUAGE_LIMIT)
+
+    def pending_count(self):
+        return sum(len(queue) for queue in self.pending.values())
+
+    def submit(self, language, code, input_data=""):
+        with self.cond:
+            self._expire()
+            pending = self.pending_count()
+            if pending >= self.max_pending:
+                raise QueueFull(self.estimate.retry_after(pending, self.workers))
+
+            job = new_job(language, code, input_data)
+            self.jobs[job['id']] = job
+            self.pending[language].append(job)
+            self.cond.notify()
+            return job_view(job)
+
+    def get(self, job_id):
+        with self.cond:
+            job = self.jobs.get(job_id)
+            return job_view(job) if job else None
+
+    def _expire(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [job_id for job_id, job in self.jobs.items()
+                   if job['finished_at'] and job['finished_at'] < cutoff]
+        for job_id in expired:
+            del self.jobs[job_id]
+
+    def _next_job(self):
+        # Oldest job among languages that are below their concurrency limit
+        candidates = [queue[0] for language, queue in self.pending.items()
+                      if queue and self.running[language] < self.limit(language)]
+        if not candidates:
+            return None
+        job = min(candidates, key=lambda j: j['submitted_at'])
+        self.pending[job['language']].popleft()
+        return job
+
+    def _work(self):
+        while True:
+            with self.cond:
+                job = self._next_job()
+                while job is None:
+                    self.cond.wait()
+                    job = self._next_job()
+                job['status'] = 'running'
+                self.running[job['language']] += 1
+
+            duration = run_job(self.execute, job)
+
+            with self.cond:
+                self.running[job['language']] -= 1
+                self.estimate.record(duration)
+                self.cond.notify_all()
+
+
+class RedisJobQueue:
+    """Redis-backed queue shared by the API and separately scaled workers (worker.py)"""
+
+    def __init__(self, url, max_pending=JOB_MAX_PENDING, language_limits=None,
+                 result_ttl=JOB_RESULT_TTL, prefix='rapidcompiler:jobs', lease=JOB_LEASE_SECONDS):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.max_pending = max_pending
+        self.language_limits = language_limits if language_limits is not None else parse_language_limits()
+        self.result_ttl = result_ttl
+        self.prefix = prefix
+        self.lease = lease
+        self.estimate = DurationEstimate()
+        self.claim_slot = self.redis.register_script(CLAIM_SLOT)
+
+    def limit(self, language):
+        return self.language_limits.get(language, JOB_DEFAULT_LANGUAGE_LIMIT)
+
+    def _queue_key(self, language):
+        return f"{self.prefix}:queue:{language}"
+
+    def _running_key(self, language):
+        # Sorted set of running job ids, scored by lease expiry
+        return f"{self.prefix}:running:{language}"
+
+    def _freed_key(self):
+        # A token per finished job, idle workers block on it
+        return f"{self.prefix}:freed"
+
+    def _job_key(self, job_id):
+        return f"{self.prefix}:job:{job_id}"
+
+    def _save(self, job):
+        self.redis.set(self._job_key(job['id']), json.dumps(job), ex=self.result_ttl)
+
+    def pending_count(self):
+        languages = self.redis.smembers(f"{self.prefix}:languages")
+        return sum(self.redis.llen(self._queue_key(language.decode())) for language in languages)
+
+    def submit(self, language, code, input_data=""):
+        pending = self.pending_count()
+        if pending >= self.max_pending:
+            workers = int(self.redis.get(f"{self.prefix}:workers") or 1)
+            self.estimate.value = float(self.redis.get(f"{self.prefix}:avg_duration") or self.estimate.value)
+            raise QueueFull(self.estimate.retry_after(pending, workers))
+
+        job = new_job(language, code, input_data)
+        self._save(job)
+        self.redis.sadd(f"{self.prefix}:languages", language)
+        self.redis.lpush(self._queue_key(language), job['id'])
+        return job_view(job)
+
+    def get(self, job_id):
+        data = self.redis.get(self._job_key(job_id))
+        return job_view(json.loads(data)) if data else None
+
+    def work(self, execute, languages, threads=JOB_WORKERS):
+        """Run worker threads consuming jobs for the given languages (blocks)"""
+        self.redis.incrby(f"{self.prefix}:workers", threads)
+        try:
+            workers = [threading.Thread(target=self._work, args=(execute, languages), daemon=True)
+                       for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            self.redis.decrby(f"{self.prefix}:workers", threads)
+
+    def _open_queues(self, languages):
+        """Queue keys of the languages with a free slot"""
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        for language in languages:
+            pipe.zcount(self._running_key(language), now, '+inf')
+        running = pipe.execute()
+        return [self._queue_key(language) for language, count in zip(languages, running)
+                if count < self.limit(language)]
+
+    def _work(self, execute, languages):
+        while True:
+            queue_keys = self._open_queues(languages)
+            if not queue_keys:
+                # Every language is at its limit: wait for a job to finish
+                self.redis.brpop(self._freed_key(), timeout=1)
+                continue
+            item = self.redis.brpop(queue_keys, timeout=1)
+            if not item:
+                continue
+            queue_key, job_id = item
+            language = queue_key.decode().rsplit(':', 1)[1]
+
+            # Enforce the per-language limit across every worker process;
+            # another worker may have taken the last slot since the check
+            if not self.claim_slot(keys=[self._running_key(language)],
+                                   args=[time.time(), self.limit(language), time.time() + self.lease, job_id]):
+                self.redis.rpush(queue_key, job_id)
+                self.redis.brpop(self._freed_key(), timeout=1)
+                continue
+
+            try:
+                data = self.redis.get(self._job_key(job_id.decode()))
+                if not data:
+                    continue  # Expired before a worker got to it
+                job = json.loads(data)
+                job['status'] = 'running'
+                self._save(job)
+                self.estimate.record(run_job(execute, job))
+                self._save(job)
+                self.redis.set(f"{self.prefix}:avg_duration", self.estimate.value)
+            finally:
+                pipe = self.redis.pipeline()
+                pipe.zrem(self._running_key(language), job_id)
+                pipe.lpush(self._freed_key(), 1)
+                pipe.ltrim(self._freed_key(), 0, 99)
+                pipe.execute()
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from jwt.algorithms import RSAAlgorithm
+
+JWKS_DEFAULT_TTL = int(os.getenv('JWKS_DEFAULT_TTL', '600'))
+# Unknown kids trigger a refetch (key rotation) at most this often
+JWKS_MIN_REFETCH_INTERVAL = int(os.getenv('JWKS_MIN_REFETCH_INTERVAL', '30'))
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', '60'))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', '1024'))
+
+
+def max_age(cache_control):
+    """Seconds from a Cache-Control header, None if absent or no-cache"""
+    if not cache_control or 'no-cache' in cache_control or 'no-store' in cache_control:
+        return None
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else None
+
+
+class JWKSCache:
+    """Signing keys from a JWKS endpoint (or a local file), parsed once and reused.
+
+    Keys are kept until the Cache-Control max-age of the response runs out.
+    A token signed with an unknown kid triggers a refetch, rate limited so a
+    flood of forged tokens cannot hammer the identity provider. If a refresh
+    fails the previous keys keep being served.
+    """
+
+    def __init__(self, jwks_url=None, jwks_file=None, default_ttl=JWKS_DEFAULT_TTL,
+                 min_refetch_interval=JWKS_MIN_REFETCH_INTERVAL):
+        self.jwks_url = jwks_url
+        self.jwks_file = jwks_file
+        self.default_ttl = default_ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.keys = {}  # kid -> key object ready for jwt.decode
+        self.expires_at = 0
+        self.last_fetch = 0
+        self.fetches = 0
+        self.lock = threading.Lock()
+
+    def _load(self):
+        if self.jwks_file:
+            with open(self.jwks_file) as f:
+                return json.load(f), None
+        response = requests.get(self.jwks_url, timeout=5)
+        response.raise_for_status()
+        return response.json(), max_age(response.headers.get('Cache-Control'))
+
+    def _refresh(self):
+        self.last_fetch = time.time()
+        self.fetches += 1
+        try:
+            jwks, ttl = self._load()
+        except (requests.RequestException, OSError, ValueError) as e:
+            print(f"JWKS refresh failed, keeping {len(self.keys)} cached keys: {e}")
+            self.expires_at = max(self.expires_at, self.last_fetch + self.min_refetch_interval)
+            return
+
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('kty') == 'RSA' and jwk.get('use', 'sig') == 'sig':
+                keys[jwk['kid']] = RSAAlgorithm.from_jwk(json.dumps(jwk))
+        self.keys = keys
+        self.expires_at = self.last_fetch + (ttl if ttl is not None else self.default_ttl)
+
+    def get_key(self, kid):
+        with self.lock:
+            now = time.time()
+            if now >= self.expires_at:
+                self._refresh()
+            elif kid not in self.keys and now - self.last_fetch >= self.min_refetch_interval:
+                self._refresh()
+            return self.keys.get(kid)
+
+
+class TokenCache:
+    """Short-lived LRU of verified token payloads, keyed by a hash of the token"""
+
+    def __init__(self, ttl=TOKEN_CACHE_TTL, max_size=TOKEN_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token):
+        key = self._key(token)
+        with self.lock:
+            entry = self.entries.get(key)
+            if not entry:
+                return None
+            payload, expires_at = entry
+            if time.time() >= expires_at:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return payload
+
+    def put(self, token, payload):
+        # Never outlive the token itself
+        expires_at = time.time() + self.ttl
+        if 'exp' in payload:
+            expires_at = min(expires_at, payload['exp'])
+
+        with self.lock:
+            self.entries[self._key(token)] = (payload, expires_at)
+            self.entries.move_to_end(self._key(token))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
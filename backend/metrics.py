@@ -0,0 +1,253 @@
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+# Prometheus text-format metrics kept in process memory. Every gunicorn worker
+# has its own counters; scrape each worker (or run one worker with threads)
+# when exact totals matter.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            series = self.values.get(key)
+            if series is None:
+                series = self.values[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.values.items()):
+                for bound, count in zip(self.buckets, series["buckets"]):
+                    labels = _format_labels(self.labelnames, key, [('le', bound)])
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                labels = _format_labels(self.labelnames, key, [('le', '+Inf')])
+                lines.append(f"{self.name}_bucket{labels} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {series['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() is called at scrape time to refresh gauges (pool sizes etc.)"""
+        self.collectors.append(collect)
+
+    def render(self):
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    'rapidcompiler_http_request_duration_seconds', 'API request latency by route',
+    ['method', 'route', 'status']))
+EXECUTIONS_TOTAL = REGISTRY.register(Counter(
+    'rapidcompiler_executions_total', 'Code executions by language and outcome',
+    ['language', 'status']))
+EXECUTIONS_IN_FLIGHT = REGISTRY.register(Gauge(
+    'rapidcompiler_executions_in_flight', 'Executions currently running',
+    ['language']))
+EXECUTION_PHASE_SECONDS = REGISTRY.register(Histogram(
+    'rapidcompiler_execution_phase_duration_seconds', 'Time spent in each execute_code phase',
+    ['language', 'phase']))
+DOCKER_API_SECONDS = REGISTRY.register(Histogram(
+    'rapidcompiler_docker_api_duration_seconds', 'Docker Engine API call latency',
+    ['method', 'endpoint']))
+DB_QUERY_SECONDS = REGISTRY.register(Histogram(
+    'rapidcompiler_db_query_duration_seconds', 'Database query latency by statement type',
+    ['operation']))
+POOL_CONNECTIONS = REGISTRY.register(Gauge(
+    'rapidcompiler_pool_connections', 'Pool occupancy (container, database and job pools)',
+    ['pool', 'key', 'state']))
+
+
+def language_label(language, languages):
+    """The language as a label value, 'unsupported' for anything outside
+    `languages` so client input can't mint new series"""
+    return language if isinstance(language, str) and language in languages else 'unsupported'
+
+
+@contextmanager
+def track_in_flight(language):
+    EXECUTIONS_IN_FLIGHT.inc(language=language)
+    try:
+        yield
+    finally:
+        EXECUTIONS_IN_FLIGHT.dec(language=language)
+
+
+def observe_execution(language, status, timings):
+    """Count an execution and observe its *_ms phase timings"""
+    EXECUTIONS_TOTAL.inc(language=language, status=status)
+    for name, value in timings.items():
+        if name.endswith('_ms') and value is not None:
+            EXECUTION_PHASE_SECONDS.observe(value / 1000, language=language, phase=name[:-3])
+
+
+_docker_id = re.compile(r'/[0-9a-f]{12,64}(?=/|$)')
+
+
+def instrument_docker_client(client):
+    """Time every Docker API request made through this client"""
+    def observe(response, *args, **kwargs):
+        path = _docker_id.sub('/{id}', re.sub(r'^/v[\d.]+', '', response.request.path_url.split('?')[0]))
+        DOCKER_API_SECONDS.observe(response.elapsed.total_seconds(), method=response.request.method, endpoint=path)
+
+    client.api.hooks['response'].append(observe)
+    return client
+
+
+def observe_query(statement, seconds):
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'UNKNOWN'
+    DB_QUERY_SECONDS.observe(seconds, operation=operation)
+
+
+def instrument_sqlalchemy():
+    """Time every statement executed by any SQLAlchemy engine"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def after(conn, cursor, statement, parameters, context, executemany):
+        observe_query(statement, time.perf_counter() - conn.info['query_started'].pop())
+
+
+def set_pool_stats(pool, stats, languages=None):
+    """Export {key: {state: count}} (e.g. ContainerPool.stats()) as gauges.
+
+    With `languages`, keys other than 'all' are language names and are
+    bounded like language_label(); unknown ones are summed as 'unsupported'.
+    """
+    values = {}
+    for key, states in stats.items():
+        if languages is not None and key != 'all':
+            key = language_label(key, languages)
+        for state, value in states.items():
+            if isinstance(value, (int, float)):
+                values[key, state] = values.get((key, state), 0) + value
+    for (key, state), value in values.items():
+        POOL_CONNECTIONS.set(value, pool=pool, key=key, state=state)
+
+
+def instrument_app(app):
+    """Request latency for every route plus a /metrics endpoint"""
+    @app.before_request
+    def start_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop('metrics_started', None)
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=request.method, route=route, status=response.status_code
+            )
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+    return app
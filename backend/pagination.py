@@ -0,0 +1,41 @@
+import base64
+from datetime import datetime
+
+PAGE_DEFAULT_LIMIT = 50
+PAGE_MAX_LIMIT = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    """Opaque keyset cursor for the (created_at, id) sort of a listing"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Returns (created_at, id as string) or raises InvalidCursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def parse_limit(value):
+    """Clamp the ?limit= parameter, falling back to the default page size"""
+    try:
+        limit = int(value) if value is not None else PAGE_DEFAULT_LIMIT
+    except ValueError:
+        limit = PAGE_DEFAULT_LIMIT
+    return max(1, min(limit, PAGE_MAX_LIMIT))
+
+
+def page_headers(rows, limit, cursor_of):
+    """X-Next-Cursor header for a page fetched with LIMIT limit + 1"""
+    if len(rows) <= limit:
+        return {}
+    return {'X-Next-Cursor': cursor_of(rows[limit - 1])}
@@ -0,0 +1,54 @@
+import os
+
+from flask import jsonify, request
+
+MAX_SOURCE_BYTES = int(os.getenv('MAX_SOURCE_BYTES', str(64 * 1024)))
+MAX_INPUT_BYTES = int(os.getenv('MAX_INPUT_BYTES', str(1024 * 1024)))
+# Whole request bodies (and WebSocket messages), with room for the JSON around
+# the source and input. Routes can allow more, see limit_request_size.
+MAX_BODY_BYTES = int(os.getenv('MAX_BODY_BYTES', str(MAX_SOURCE_BYTES + MAX_INPUT_BYTES + 64 * 1024)))
+
+
+def describe_size(size):
+    return f"{size // 1024}KB" if size >= 1024 else f"{size} bytes"
+
+
+def size_error(code, input_data=None):
+    """Message for a source or stdin over its limit, else None"""
+    if code and len(code.encode('utf-8')) > MAX_SOURCE_BYTES:
+        return f"Source code exceeds the {describe_size(MAX_SOURCE_BYTES)} limit"
+    if input_data and len(input_data.encode('utf-8')) > MAX_INPUT_BYTES:
+        return f"Input exceeds the {describe_size(MAX_INPUT_BYTES)} limit"
+    return None
+
+
+def body_size_error(limit):
+    return f"Request body exceeds the {describe_size(limit)} limit"
+
+
+def limit_request_size(app, endpoint_limits=None):
+    """Reject oversized bodies with 413 before they are read.
+
+    A declared Content-Length over the endpoint's limit (endpoint_limits,
+    else MAX_BODY_BYTES) is refused without touching the body; chunked
+    bodies are cut off by Werkzeug at the largest limit.
+    """
+    endpoint_limits = endpoint_limits or {}
+    app.config['MAX_CONTENT_LENGTH'] = max([MAX_BODY_BYTES] + list(endpoint_limits.values()))
+    app.config.setdefault('SOCK_SERVER_OPTIONS', {})['max_message_size'] = MAX_BODY_BYTES
+
+    def too_large(limit):
+        response = jsonify({"error": body_size_error(limit)})
+        response.status_code = 413
+        response.headers['Connection'] = 'close'
+        return response
+
+    @app.before_request
+    def check_content_length():
+        limit = endpoint_limits.get(request.endpoint, MAX_BODY_BYTES)
+        if request.content_length is not None and request.content_length > limit:
+            return too_large(limit)
+
+    @app.errorhandler(413)
+    def request_entity_too_large(e):
+        return too_large(app.config['MAX_CONTENT_LENGTH'])
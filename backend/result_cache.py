@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+
+from cache import make_cache
+
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'false').lower() == 'true'
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', '300'))
+RESULT_CACHE_SIZE = int(os.getenv('RESULT_CACHE_SIZE', '2048'))
+RESULT_CACHE_MAX_ENTRY_BYTES = int(os.getenv('RESULT_CACHE_MAX_ENTRY_BYTES', str(64 * 1024)))
+
+
+class ResultCache:
+    """Memoized execution results for byte-identical (language, image, code, stdin).
+
+    Only successful runs are stored: errors may come from timeouts or the
+    Docker daemon rather than from the program, and must not be replayed.
+    """
+
+    def __init__(self, url=None, ttl=RESULT_CACHE_TTL, max_entries=RESULT_CACHE_SIZE,
+                 max_entry_bytes=RESULT_CACHE_MAX_ENTRY_BYTES):
+        self.cache = make_cache(url, prefix='rapidcompiler:result', max_entries=max_entries, ttl=ttl)
+        self.max_entry_bytes = max_entry_bytes
+
+    @staticmethod
+    def key(language, image_id, code, input_data):
+        digest = hashlib.sha256()
+        for part in (language, image_id, code, input_data or ''):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def put(self, key, result):
+        if result.get('error') is not None:
+            return
+        if len(json.dumps(result)) > self.max_entry_bytes:
+            return
+        self.cache.set(key, result)
+
+    def stats(self):
+        return self.cache.stats()
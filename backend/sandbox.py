@@ -0,0 +1,354 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+from capture import OUTPUT_MAX_BYTES, OutputCapture, output_limit_message
+
+# Local sandbox for app-simple.py / app-working.py: every run gets rlimits,
+# its own cgroup (cgroup v2, when SANDBOX_CGROUP_ROOT is a delegated,
+# writable directory) and fresh user/mount/net namespaces where the kernel
+# allows unprivileged ones. On Windows commands run without limits.
+
+SANDBOX_ENABLED = os.getenv('SANDBOX_ENABLED', 'true').lower() == 'true' and sys.platform.startswith('linux')
+SANDBOX_CPU_SECONDS = int(os.getenv('SANDBOX_CPU_SECONDS', '5'))
+SANDBOX_MEMORY_MB = int(os.getenv('SANDBOX_MEMORY_MB', '256'))
+SANDBOX_MAX_PROCESSES = int(os.getenv('SANDBOX_MAX_PROCESSES', '64'))
+SANDBOX_MAX_FILE_MB = int(os.getenv('SANDBOX_MAX_FILE_MB', '16'))
+SANDBOX_MAX_OPEN_FILES = int(os.getenv('SANDBOX_MAX_OPEN_FILES', '64'))
+# Wall clock backstop for programs that sleep or block instead of using CPU
+SANDBOX_WALL_TIMEOUT = int(os.getenv('SANDBOX_WALL_TIMEOUT', '10'))
+SANDBOX_CGROUP_ROOT = os.getenv('SANDBOX_CGROUP_ROOT', '/sys/fs/cgroup/rapidcompiler')
+SANDBOX_NAMESPACES = os.getenv('SANDBOX_NAMESPACES', 'true').lower() == 'true'
+
+RUN_LIMITS = {
+    'cpu_seconds': SANDBOX_CPU_SECONDS,
+    'memory_mb': SANDBOX_MEMORY_MB,
+    'processes': SANDBOX_MAX_PROCESSES,
+    'file_size_mb': SANDBOX_MAX_FILE_MB,
+}
+# Compilers (cc1plus, javac's JVM) need more room than the programs they build
+COMPILE_LIMITS = {
+    'cpu_seconds': 10,
+    'memory_mb': 1024,
+    'processes': SANDBOX_MAX_PROCESSES,
+    'file_size_mb': 64,
+}
+
+CLONE_NEWNS = 0x00020000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWNET = 0x40000000
+MS_BIND = 0x1000
+MS_REC = 0x4000
+MS_PRIVATE = 0x40000
+MS_NOSUID = 0x2
+MS_NODEV = 0x4
+
+if SANDBOX_ENABLED:
+    import ctypes
+    import resource
+
+    _libc = ctypes.CDLL(None, use_errno=True)
+
+
+def _check(result):
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+
+def _cgroup_available():
+    if not SANDBOX_ENABLED or not os.path.isdir(SANDBOX_CGROUP_ROOT):
+        return False
+    if not os.access(os.path.join(SANDBOX_CGROUP_ROOT, 'cgroup.subtree_control'), os.W_OK):
+        return False
+    try:
+        with open(os.path.join(SANDBOX_CGROUP_ROOT, 'cgroup.subtree_control'), 'w') as f:
+            f.write('+memory +pids')
+        return True
+    except OSError as e:
+        print(f"Sandbox cgroups unavailable ({SANDBOX_CGROUP_ROOT}): {e}")
+        return False
+
+
+def _write(path, value):
+    with open(path, 'w') as f:
+        f.write(value)
+
+
+def _user_task_count():
+    """Tasks owned by our uid, RLIMIT_NPROC counts all of them, not just the run's"""
+    uid = str(os.getuid())
+    count = 0
+    for pid in os.listdir('/proc'):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f'/proc/{pid}/status') as f:
+                fields = dict(line.split(':', 1) for line in f if ':' in line)
+        except OSError:
+            continue
+        if fields.get('Uid', '').split()[:1] == [uid]:
+            count += int(fields.get('Threads', '1'))
+    return count
+
+
+class Sandbox:
+    """Limits and isolation for one child process tree.
+
+    Use popen_kwargs() when starting the process and cleanup() once it is
+    done; cleanup kills whatever the program left running.
+    """
+
+    def __init__(self, cpu_seconds=SANDBOX_CPU_SECONDS, memory_mb=SANDBOX_MEMORY_MB,
+                 processes=SANDBOX_MAX_PROCESSES, file_size_mb=SANDBOX_MAX_FILE_MB, work_dir=None, isolate=True):
+        # isolate=False gives a plain subprocess with the same interface
+        self.enabled = SANDBOX_ENABLED and isolate
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_mb * 1024 * 1024
+        self.processes = processes
+        self.file_size_bytes = file_size_mb * 1024 * 1024
+        self.work_dir = os.path.realpath(work_dir) if work_dir else None
+        self.cgroup = None
+        self.process = None
+        if not self.enabled:
+            return
+
+        if CGROUPS_AVAILABLE:
+            self.cgroup = os.path.join(SANDBOX_CGROUP_ROOT, f"run-{uuid.uuid4().hex}")
+            try:
+                os.mkdir(self.cgroup)
+                _write(os.path.join(self.cgroup, 'memory.max'), str(self.memory_bytes))
+                _write(os.path.join(self.cgroup, 'memory.swap.max'), '0')
+                _write(os.path.join(self.cgroup, 'pids.max'), str(processes))
+            except OSError as e:
+                print(f"Could not create sandbox cgroup: {e}")
+                self._remove_cgroup()
+        # Without a cgroup the process limit falls back to RLIMIT_NPROC, which
+        # is per user (and not enforced for root)
+        self.nproc = None if self.cgroup else _user_task_count() + processes
+
+    def popen_kwargs(self):
+        if not self.enabled:
+            return {}
+        return {'preexec_fn': self._child_setup, 'start_new_session': True}
+
+    def attach(self, process):
+        self.process = process
+
+    def _child_setup(self):
+        # Runs in the forked child before exec: keep it to syscalls
+        if self.cgroup:
+            _write(os.path.join(self.cgroup, 'cgroup.procs'), str(os.getpid()))
+
+        resource.setrlimit(resource.RLIMIT_CPU, (self.cpu_seconds, self.cpu_seconds + 1))
+        # RLIMIT_DATA rather than RLIMIT_AS: the JVM and V8 reserve far more
+        # address space than they ever touch
+        resource.setrlimit(resource.RLIMIT_DATA, (self.memory_bytes, self.memory_bytes))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (self.file_size_bytes, self.file_size_bytes))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (SANDBOX_MAX_OPEN_FILES, SANDBOX_MAX_OPEN_FILES))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        if self.nproc is not None:
+            resource.setrlimit(resource.RLIMIT_NPROC, (self.nproc, self.nproc))
+
+        if NAMESPACES_AVAILABLE:
+            self._enter_namespaces()
+
+    def _enter_namespaces(self):
+        uid, gid = os.getuid(), os.getgid()
+        _check(_libc.unshare(CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWNET))
+        # Same ids inside as outside: files keep their owner, and a non-root
+        # user loses the namespace capabilities again on exec
+        _write('/proc/self/setgroups', 'deny')
+        _write('/proc/self/uid_map', f'{uid} {uid} 1')
+        _write('/proc/self/gid_map', f'{gid} {gid} 1')
+
+        # Mount changes stay in this namespace; the run gets an empty, private
+        # /tmp and /dev/shm. A working directory under one of them is held
+        # open across the mount and bound back in at the same path, so the
+        # run sees its own files and no one else's.
+        _check(_libc.mount(b'none', b'/', None, MS_REC | MS_PRIVATE, None))
+        size = f'size={self.file_size_bytes}'.encode()
+        for target in ('/tmp', '/dev/shm'):
+            if not os.path.isdir(target):
+                continue
+            work_dir = None
+            if self.work_dir and (self.work_dir + '/').startswith(target + '/'):
+                work_dir = os.open(self.work_dir, os.O_PATH | os.O_DIRECTORY)
+            _check(_libc.mount(b'tmpfs', target.encode(), b'tmpfs', MS_NOSUID | MS_NODEV, size))
+            if work_dir is not None:
+                os.makedirs(self.work_dir, mode=0o700)
+                _check(_libc.mount(f'/proc/self/fd/{work_dir}'.encode(), self.work_dir.encode(), None,
+                                   MS_BIND | MS_REC, None))
+                os.close(work_dir)
+                os.chdir(self.work_dir)
+
+    def memory_exceeded(self):
+        if not self.cgroup:
+            return False
+        try:
+            with open(os.path.join(self.cgroup, 'memory.events')) as f:
+                events = dict(line.split() for line in f if line.strip())
+            return int(events.get('oom_kill', 0)) > 0
+        except OSError:
+            return False
+
+    def kill(self):
+        if self.cgroup:
+            try:
+                _write(os.path.join(self.cgroup, 'cgroup.kill'), '1')
+                return
+            except OSError:
+                pass  # Kernels before 5.14, kill the process group instead
+        if self.process and self.enabled:
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+        elif self.process:
+            self.process.kill()
+
+    def cleanup(self):
+        self.kill()
+        self._remove_cgroup()
+
+    def _remove_cgroup(self):
+        if self.cgroup:
+            try:
+                os.rmdir(self.cgroup)
+            except OSError:
+                pass
+            self.cgroup = None
+
+
+def describe_failure(sandbox, returncode, cpu_seconds):
+    """Human readable reason for a run the sandbox killed, or None"""
+    if not sandbox.enabled:
+        return None
+    if sandbox.memory_exceeded():
+        return f"Memory limit exceeded ({sandbox.memory_bytes // (1024 * 1024)}MB)"
+    if returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+        return f"CPU time limit exceeded ({cpu_seconds}s)"
+    if returncode == -signal.SIGXFSZ:
+        return "Output file size limit exceeded"
+    return None
+
+
+class SandboxResult(subprocess.CompletedProcess):
+    """CompletedProcess plus the run's resource usage ({cpu_ms, max_rss_kb} or
+    None) and whether its output went over the cap"""
+
+    def __init__(self, args, returncode, stdout, stderr, usage, truncated=False, output_bytes=0):
+        super().__init__(args, returncode, stdout, stderr)
+        self.usage = usage
+        self.truncated = truncated
+        self.output_bytes = output_bytes
+
+
+def _communicate(process, input, timeout, capture):
+    """Popen.communicate into an OutputCapture, except the child is reaped
+    with wait4 to get its rusage.
+
+    Returns usage, raises subprocess.TimeoutExpired with the child still running.
+    """
+    def read(name, pipe):
+        for chunk in iter(lambda: pipe.read1(65536), b''):
+            capture.feed(name, chunk)
+        pipe.close()
+
+    def write():
+        try:
+            if input:
+                process.stdin.write(input)
+            process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+    threads = [threading.Thread(target=write, daemon=True)] + [
+        threading.Thread(target=read, args=(name, pipe), daemon=True)
+        for name, pipe in (('stdout', process.stdout), ('stderr', process.stderr))
+    ]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    for thread in threads[1:]:
+        thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+        if thread.is_alive():
+            raise subprocess.TimeoutExpired(process.args, timeout)
+
+    if not hasattr(os, 'wait4'):
+        process.wait()
+        return None
+    _, status, rusage = os.wait4(process.pid, 0)
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return {'cpu_ms': int((rusage.ru_utime + rusage.ru_stime) * 1000), 'max_rss_kb': rusage.ru_maxrss}
+
+
+def run_sandboxed(cmd, input=None, text=False, cwd=None, timeout=SANDBOX_WALL_TIMEOUT, limits=None, isolate=True,
+                  max_output=OUTPUT_MAX_BYTES):
+    """subprocess.run(capture_output=True) under a Sandbox, returns a SandboxResult.
+
+    Raises subprocess.TimeoutExpired on the wall clock timeout like
+    subprocess.run; a run killed for CPU time, memory or printing more than
+    max_output bytes returns normally with the reason appended to stderr.
+    Output is decoded leniently, invalid UTF-8 becomes U+FFFD.
+    """
+    limits = dict(RUN_LIMITS, **(limits or {}))
+    sandbox = Sandbox(work_dir=cwd, isolate=isolate, **limits)
+    capture = OutputCapture(max_output, on_overflow=sandbox.kill)
+    if isinstance(input, str):
+        input = input.encode('utf-8')
+    try:
+        process = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=cwd,
+            **sandbox.popen_kwargs()
+        )
+        sandbox.attach(process)
+        try:
+            usage = _communicate(process, input, timeout, capture)
+        except subprocess.TimeoutExpired:
+            sandbox.kill()
+            process.wait()
+            raise
+        stdout, stderr = capture.stdout, capture.stderr
+        if capture.truncated:
+            reason = output_limit_message(max_output)
+        else:
+            reason = describe_failure(sandbox, process.returncode, limits['cpu_seconds'])
+        if reason:
+            stderr = stderr + '\n' + reason if stderr else reason
+        if not text:
+            stdout, stderr = stdout.encode('utf-8'), stderr.encode('utf-8')
+        return SandboxResult(cmd, process.returncode, stdout, stderr, usage, capture.truncated,
+                             capture.output_bytes)
+    finally:
+        sandbox.cleanup()
+
+
+def _namespaces_available():
+    if not SANDBOX_ENABLED or not SANDBOX_NAMESPACES:
+        return False
+    # unshare() must happen in a single threaded process: probe in a child
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _check(_libc.unshare(CLONE_NEWUSER | CLONE_NEWNS | CLONE_NEWNET))
+            os._exit(0)
+        except BaseException:
+            os._exit(1)
+    _, status = os.waitpid(pid, 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        print("Sandbox namespaces unavailable, running with rlimits only")
+        return False
+    return True
+
+
+CGROUPS_AVAILABLE = _cgroup_available()
+NAMESPACES_AVAILABLE = _namespaces_available()
@@ -0,0 +1,377 @@
+import asyncio
+import codecs
+import json
+import os
+import queue
+import socket
+import subprocess
+import threading
+import time
+
+from request_limits import size_error
+
+STREAM_MAX_OUTPUT_BYTES = int(os.getenv('STREAM_MAX_OUTPUT_BYTES', str(1024 * 1024)))
+STREAM_TIMEOUT = int(os.getenv('STREAM_TIMEOUT', '10'))
+
+# WebSocket protocol for /ws/run
+#   client -> server: {"language", "code", "input"?} to start, then
+#                     {"stdin": "..."} for more input and {"eof": true} to close stdin
+#   server -> client: {"type": "queued", "position", "estimated_wait_ms"} if it
+#                     waits for an execution slot (admission.py),
+#                     {"type": "stdout"|"stderr", "data": "..."} while running,
+#                     {"type": "error", "error": "..."} if it could not start,
+#                     {"type": "exit", "exit_code", "timed_out", "truncated",
+#                      "output_bytes", "duration_ms"} at the end
+
+
+def parse_start(message):
+    """Returns ((language, code, input), None) or (None, error)"""
+    try:
+        data = json.loads(message or '{}')
+    except (TypeError, ValueError):
+        data = {}
+    if not isinstance(data, dict):
+        data = {}
+
+    language = data.get('language')
+    code = data.get('code')
+    input_data = data.get('input', '')
+    if not language or not code:
+        return None, "Language and code are required"
+    if not all(isinstance(value, str) for value in (language, code, input_data)):
+        return None, "Language, code and input must be strings"
+    too_large = size_error(code, input_data)
+    if too_large:
+        return None, too_large
+    return (language, code, input_data), None
+
+
+def receive_start(ws):
+    """Read the start message, returns (language, code, input) or sends an error"""
+    start, error = parse_start(ws.receive(timeout=STREAM_TIMEOUT))
+    if error:
+        send_error(ws, error)
+    return start
+
+
+def error_message(error):
+    return json.dumps({"type": "error", "error": error})
+
+
+def send_error(ws, error):
+    ws.send(error_message(error))
+
+
+def queued_message(ticket):
+    return json.dumps({"type": "queued", "position": ticket.position,
+                       "estimated_wait_ms": ticket.estimated_wait_ms})
+
+
+class DockerExecStream:
+    """Run a command in a container through exec with an attached socket"""
+
+    def __init__(self, container, cmd):
+        from docker.utils.socket import frames_iter
+
+        self.container = container
+        self.api = container.client.api
+        self.exec_id = self.api.exec_create(container.id, cmd, stdin=True)['Id']
+        self.socket = self.api.exec_start(self.exec_id, socket=True)
+        self.raw = getattr(self.socket, '_sock', self.socket)
+        self._frames = frames_iter(self.socket, tty=False)
+
+    def frames(self):
+        from docker.utils.socket import STDERR
+
+        for stream, data in self._frames:
+            yield ('stderr' if stream == STDERR else 'stdout'), data
+
+    def write(self, data):
+        self.raw.sendall(data)
+
+    def close_stdin(self):
+        try:
+            self.raw.shutdown(socket.SHUT_WR)
+        except OSError:
+            pass
+
+    def kill(self):
+        # The container is single use, so killing it is the way to stop the exec
+        try:
+            self.container.kill()
+        except Exception:
+            pass
+
+    def exit_code(self):
+        try:
+            return self.api.exec_inspect(self.exec_id)['ExitCode']
+        except Exception:
+            return None
+        finally:
+            self.raw.close()
+
+
+class SubprocessStream:
+    """Run a local command with piped stdio, reading both streams as they arrive.
+
+    With a sandbox.Sandbox the command runs under its limits, and the sandbox
+    is cleaned up once the exit code has been collected.
+    """
+
+    def __init__(self, cmd, cwd=None, sandbox=None):
+        self.sandbox = sandbox
+        self.process = subprocess.Popen(
+            cmd,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            **(sandbox.popen_kwargs() if sandbox else {})
+        )
+        if sandbox:
+            sandbox.attach(self.process)
+        self.chunks = queue.Queue()
+        for name, pipe in (('stdout', self.process.stdout), ('stderr', self.process.stderr)):
+            threading.Thread(target=self._read, args=(name, pipe), daemon=True).start()
+
+    def _read(self, name, pipe):
+        for chunk in iter(lambda: pipe.read(4096), b''):
+            self.chunks.put((name, chunk))
+        self.chunks.put((name, None))
+
+    def frames(self):
+        open_streams = 2
+        while open_streams:
+            name, chunk = self.chunks.get()
+            if chunk is None:
+                open_streams -= 1
+            else:
+                yield name, chunk
+
+    def write(self, data):
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+
+    def close_stdin(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+    def kill(self):
+        if self.sandbox:
+            self.sandbox.kill()
+            return
+        try:
+            self.process.kill()
+        except OSError:
+            pass
+
+    def exit_code(self):
+        try:
+            return self.process.wait()
+        finally:
+            if self.sandbox:
+                self.sandbox.cleanup()
+
+
+def forward_stdin(ws, process, input_data=""):
+    """Relay {"stdin": ...} messages from the client until EOF or disconnect"""
+    try:
+        if input_data:
+            process.write(input_data.encode('utf-8'))
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            data = json.loads(message)
+            if data.get('stdin'):
+                process.write(data['stdin'].encode('utf-8'))
+            if data.get('eof'):
+                break
+    except Exception:
+        pass
+    process.close_stdin()
+
+
+class OutputRelay:
+    """Turns output chunks into stdout/stderr messages until max_bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.decoders = {name: codecs.getincrementaldecoder('utf-8')(errors='replace') for name in ('stdout', 'stderr')}
+        self.output_bytes = 0
+        self.truncated = False
+
+    def messages(self, name, chunk):
+        remaining = self.max_bytes - self.output_bytes
+        self.output_bytes += len(chunk)
+        if len(chunk) > remaining:
+            chunk = chunk[:remaining]
+            self.truncated = True
+        text = self.decoders[name].decode(chunk)
+        return [json.dumps({"type": name, "data": text})] if text else []
+
+    def flush(self):
+        messages = []
+        for name, decoder in self.decoders.items():
+            text = decoder.decode(b'', final=True)
+            if text:
+                messages.append(json.dumps({"type": name, "data": text}))
+        return messages
+
+    def exit_message(self, exit_code, timed_out, started):
+        return json.dumps({
+            "type": "exit",
+            "exit_code": exit_code,
+            "timed_out": timed_out,
+            "truncated": self.truncated,
+            "output_bytes": self.output_bytes,
+            "duration_ms": int((time.time() - started) * 1000)
+        })
+
+
+def stream_execution(ws, process, input_data="", timeout=STREAM_TIMEOUT, max_bytes=STREAM_MAX_OUTPUT_BYTES):
+    """Send output chunks as they are produced, then the exit summary"""
+    started = time.time()
+    timed_out = threading.Event()
+
+    def on_timeout():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, on_timeout)
+    timer.start()
+
+    threading.Thread(target=forward_stdin, args=(ws, process, input_data), daemon=True).start()
+
+    relay = OutputRelay(max_bytes)
+    try:
+        for name, chunk in process.frames():
+            for message in relay.messages(name, chunk):
+                ws.send(message)
+            if relay.truncated:
+                process.kill()
+                break
+    finally:
+        timer.cancel()
+
+    for message in relay.flush():
+        ws.send(message)
+    ws.send(relay.exit_message(process.exit_code(), timed_out.is_set(), started))
+
+
+# The same protocol for the asyncio server (asgi.py). `ws` there has
+# `await ws.receive(timeout=None)` (None once the client is gone) and
+# `await ws.send(text)`.
+
+class AsyncExecStream:
+    """A DockerExecStream read and written on the event loop.
+
+    The exec is set up through docker-py (in a thread, it is quick), then
+    its hijacked socket is used non-blocking, so a waiting or slow program
+    costs no thread. Frames are Docker's multiplexed stdio format: an 8 byte
+    header (stream type, 3 zero bytes, big-endian length) and the payload.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.raw = stream.raw
+        self.raw.setblocking(False)
+        self.buffer = bytearray()
+
+    async def _read(self, size):
+        loop = asyncio.get_running_loop()
+        while len(self.buffer) < size:
+            data = await loop.sock_recv(self.raw, 65536)
+            if not data:
+                return None
+            self.buffer += data
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    async def frames(self):
+        while True:
+            header = await self._read(8)
+            if header is None:
+                return
+            data = await self._read(int.from_bytes(header[4:8], 'big'))
+            if data is None:
+                return
+            if data:
+                yield ('stderr' if header[0] == 2 else 'stdout'), data
+
+    async def write(self, data):
+        await asyncio.get_running_loop().sock_sendall(self.raw, data)
+
+    def close_stdin(self):
+        self.stream.close_stdin()
+
+    async def kill(self):
+        await asyncio.to_thread(self.stream.kill)
+
+    async def exit_code(self):
+        return await asyncio.to_thread(self.stream.exit_code)
+
+
+async def receive_start_async(ws):
+    start, error = parse_start(await ws.receive(timeout=STREAM_TIMEOUT))
+    if error:
+        await ws.send(error_message(error))
+    return start
+
+
+async def forward_stdin_async(ws, process, input_data=""):
+    try:
+        if input_data:
+            await process.write(input_data.encode('utf-8'))
+        while True:
+            message = await ws.receive()
+            if message is None:
+                break
+            data = json.loads(message)
+            if data.get('stdin'):
+                await process.write(data['stdin'].encode('utf-8'))
+            if data.get('eof'):
+                break
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        pass
+    process.close_stdin()
+
+
+async def stream_execution_async(ws, process, input_data="", timeout=STREAM_TIMEOUT,
+                                 max_bytes=STREAM_MAX_OUTPUT_BYTES):
+    started = time.time()
+    loop = asyncio.get_running_loop()
+    timed_out = False
+    kills = []
+
+    def on_timeout():
+        nonlocal timed_out
+        timed_out = True
+        kills.append(loop.create_task(process.kill()))
+
+    timer = loop.call_later(timeout, on_timeout)
+    stdin = loop.create_task(forward_stdin_async(ws, process, input_data))
+
+    relay = OutputRelay(max_bytes)
+    try:
+        async for name, chunk in process.frames():
+            for message in relay.messages(name, chunk):
+                await ws.send(message)
+            if relay.truncated:
+                await process.kill()
+                break
+    finally:
+        timer.cancel()
+        stdin.cancel()
+        if kills:
+            await asyncio.gather(*kills, return_exceptions=True)
+
+    for message in relay.flush():
+        await ws.send(message)
+    await ws.send(relay.exit_message(await process.exit_code(), timed_out, started))
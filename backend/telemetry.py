@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+TELEMETRY_ENABLED = os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true'
+TELEMETRY_BATCH_SIZE = int(os.getenv('TELEMETRY_BATCH_SIZE', '100'))
+TELEMETRY_FLUSH_INTERVAL = float(os.getenv('TELEMETRY_FLUSH_INTERVAL', '2'))
+TELEMETRY_MAX_BUFFER = int(os.getenv('TELEMETRY_MAX_BUFFER', '10000'))
+
+# Phase names recorded by execute_code, in execution order
+PHASES = ['queue_wait_ms', 'container_start_ms', 'compile_ms', 'run_ms', 'teardown_ms']
+
+
+@contextmanager
+def phase(timings, name):
+    """Add the wall time of the block to timings[name] in milliseconds"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + int((time.perf_counter() - started) * 1000)
+
+
+def execution_status(result, timings):
+    error = result.get('error')
+    if error is None:
+        return 'ok'
+    if result.get('truncated'):
+        return 'output_limit'
+    if 'timeout' in error.lower():
+        return 'timeout'
+    return 'error'
+
+
+class BatchWriter:
+    """Buffers records in memory and hands them to flush(records) in batches.
+
+    record() never blocks on the database: a background thread flushes every
+    flush_interval seconds or once batch_size records are waiting. When the
+    database falls behind, the oldest records are dropped (and counted). A
+    batch the database rejects is retried record by record.
+    """
+
+    def __init__(self, flush, batch_size=TELEMETRY_BATCH_SIZE, flush_interval=TELEMETRY_FLUSH_INTERVAL,
+                 max_buffer=TELEMETRY_MAX_BUFFER):
+        self.flush = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = deque(maxlen=max_buffer)
+        self.dropped = 0
+        self.written = 0
+        self.failed_batches = 0
+        self.failed_records = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.owner_pid = None
+
+    def record(self, record):
+        with self.lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+            self.buffer.append(record)
+            if self.owner_pid != os.getpid():
+                # Started lazily so it belongs to the gunicorn worker, not the master
+                self.owner_pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True).start()
+            if len(self.buffer) >= self.batch_size:
+                self.wakeup.set()
+
+    def _take_batch(self):
+        with self.lock:
+            batch = []
+            while self.buffer and len(batch) < self.batch_size:
+                batch.append(self.buffer.popleft())
+            return batch
+
+    def flush_pending(self):
+        batch = self._take_batch()
+        while batch:
+            try:
+                self.flush(batch)
+                self.written += len(batch)
+            except Exception as e:
+                self.failed_batches += 1
+                failed = self._flush_each(batch) if len(batch) > 1 else len(batch)
+                self.failed_records += failed
+                print(f"Telemetry flush failed ({e}), dropped {failed} of {len(batch)} records")
+            batch = self._take_batch()
+
+    def _flush_each(self, batch, give_up_after=3):
+        """Retry a failed batch one record at a time, so one bad record only
+        loses itself. Consecutive failures mean the database itself is
+        failing; the rest of the batch is dropped. Returns records lost."""
+        failed = consecutive = 0
+        for index, record in enumerate(batch):
+            try:
+                self.flush([record])
+                self.written += 1
+                consecutive = 0
+            except Exception:
+                failed += 1
+                consecutive += 1
+                if consecutive >= give_up_after:
+                    return failed + len(batch) - index - 1
+        return failed
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush_pending()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "buffered": len(self.buffer),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed_batches": self.failed_batches,
+                "failed_records": self.failed_records
+            }
@@ -0,0 +1,45 @@
+import hashlib
+
+# Edits for PATCH /api/projects/<id>: a list of
+#   {"start": int, "end": int, "text": str}
+# replacing base[start:end] with text. Offsets are into the base version, in
+# UTF-16 code units (what JavaScript strings and browser editors count in),
+# ascending and non-overlapping.
+
+
+class PatchError(ValueError):
+    pass
+
+
+def apply_patch(text, edits):
+    """Apply edits to text, raises PatchError if they don't fit it"""
+    if not isinstance(edits, list):
+        raise PatchError("edits must be a list")
+
+    base = text.encode('utf-16-le')
+    parts = []
+    position = 0
+    for edit in edits:
+        if not isinstance(edit, dict):
+            raise PatchError("each edit must be an object")
+        start, end, insert = edit.get('start'), edit.get('end'), edit.get('text', '')
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in (start, end)):
+            raise PatchError("start and end must be integers")
+        if not isinstance(insert, str):
+            raise PatchError("text must be a string")
+        if not position <= start <= end <= len(base) // 2:
+            raise PatchError(f"edit {start}-{end} is out of order or out of range")
+        parts.append(base[position * 2:start * 2])
+        parts.append(insert.encode('utf-16-le', errors='surrogatepass'))
+        position = end
+    parts.append(base[position * 2:])
+
+    try:
+        return b''.join(parts).decode('utf-16-le')
+    except UnicodeDecodeError:
+        raise PatchError("edit splits a surrogate pair") from None
+
+
+def checksum(text):
+    """What clients send as "sha256" to confirm they hold the same text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
@@ -0,0 +1,20 @@
+import os
+
+from app import LANGUAGE_CONFIG, execute_and_record
+from job_queue import JOB_WORKERS, RedisJobQueue
+
+# Standalone execution worker for the Redis job queue.
+# Run as many of these as needed: JOB_QUEUE_URL=redis://... python worker.py
+# WORKER_LANGUAGES limits a worker to some languages, e.g. "c,cpp,java"
+
+if __name__ == "__main__":
+    queue_url = os.getenv('JOB_QUEUE_URL')
+    if not queue_url:
+        raise SystemExit("JOB_QUEUE_URL is required to run a standalone worker")
+
+    languages = [language.strip() for language in os.getenv('WORKER_LANGUAGES', '').split(',') if language.strip()]
+    languages = languages or list(LANGUAGE_CONFIG)
+    threads = int(os.getenv('WORKER_THREADS', JOB_WORKERS))
+
+    print(f"Execution worker: {threads} threads for {', '.join(languages)}")
+    RedisJobQueue(queue_url).work(execute_and_record, languages, threads=threads)
@@ -0,0 +1,251 @@
+"""Load generator for /api/run: latency percentiles, throughput and error rate
+per language and workload, written as JSON to compare versions.
+
+    python benchmark/bench.py --backend docker-pool -c 1,8,32
+    python benchmark/bench.py --backend sandbox --url http://localhost:5000 -l python,c
+    python benchmark/bench.py --compare before.json after.json
+
+Programs come from benchmark/corpus/<language>/<workload>.<ext>. The server
+decides which executor runs them, so --backend is a label for the
+configuration under test (e.g. EXECUTOR_ISOLATION or POOL_ENABLED settings).
+Results are not cached: every request is sent with "cache": "bypass".
+
+The server rate limits callers (backend/admission.py), and the anonymous tier
+is far too small for a load test: pass --token (or BENCH_TOKEN) with the JWT
+of a pro or team account, or run the server with ADMISSION_ENABLED=false.
+Runs answered with 429 are counted as errors.
+
+The output workload prints about 790 KB, under the server's default
+OUTPUT_MAX_BYTES (1 MiB); a server with a lower cap truncates it and the run
+comes back with an error.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(HERE, 'corpus')
+
+WORKLOADS = ['hello', 'cpu', 'io', 'output', 'compile']
+# stdin for each workload, io.* sums one number per line
+WORKLOAD_INPUT = {
+    'io': ''.join(f"{i}\n" for i in range(50000)),
+}
+PERCENTILES = [50, 90, 95, 99]
+# Compared metrics and the direction that counts as a regression
+COMPARED = [('p50', 'latency', 1), ('p95', 'latency', 1), ('throughput_rps', None, -1), ('error_rate', None, 1)]
+
+
+def load_corpus(languages=None, workloads=None):
+    """{(language, workload): code} for the programs on disk"""
+    corpus = {}
+    for language in sorted(os.listdir(CORPUS_DIR)):
+        if languages and language not in languages:
+            continue
+        for filename in sorted(os.listdir(os.path.join(CORPUS_DIR, language))):
+            workload = os.path.splitext(filename)[0]
+            if workloads and workload not in workloads:
+                continue
+            with open(os.path.join(CORPUS_DIR, language, filename)) as f:
+                corpus[(language, workload)] = f.read()
+    return corpus
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+class Client:
+    """One keep-alive connection per worker thread"""
+
+    def __init__(self, url, timeout, token=None):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.path = (parts.path.rstrip('/') or '') + '/api/run'
+        self.timeout = timeout
+        self.headers = {'Content-Type': 'application/json'}
+        if token:
+            self.headers['Authorization'] = f"Bearer {token}"
+        self.local = threading.local()
+
+    def _connection(self):
+        if getattr(self.local, 'connection', None) is None:
+            self.local.connection = self.connection_class(self.netloc, timeout=self.timeout)
+        return self.local.connection
+
+    def run(self, language, code, input_data):
+        """Returns (latency_ms, error or None)"""
+        body = json.dumps({"language": language, "code": code, "input": input_data, "cache": "bypass"})
+        started = time.perf_counter()
+        try:
+            connection = self._connection()
+            connection.request('POST', self.path, body, self.headers)
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.local.connection = None
+            return (time.perf_counter() - started) * 1000, f"{type(e).__name__}: {e}"
+        latency = (time.perf_counter() - started) * 1000
+        if response.status != 200:
+            return latency, f"HTTP {response.status}: {payload[:200].decode('utf-8', errors='replace')}"
+        try:
+            error = json.loads(payload).get('error')
+        except ValueError:
+            return latency, "invalid JSON response"
+        return latency, (str(error)[:200] if error else None)
+
+
+def run_case(client, language, workload, code, concurrency, requests, warmup):
+    input_data = WORKLOAD_INPUT.get(workload, '')
+    for _ in range(warmup):
+        client.run(language, code, input_data)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        started = time.perf_counter()
+        outcomes = list(pool.map(lambda _: client.run(language, code, input_data), range(requests)))
+        duration = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in outcomes)
+    errors = [error for _, error in outcomes if error]
+    latency = {"min": round(latencies[0], 1), "mean": round(sum(latencies) / len(latencies), 1),
+               "max": round(latencies[-1], 1)}
+    latency.update({f"p{p}": round(percentile(latencies, p), 1) for p in PERCENTILES})
+    return {
+        "language": language,
+        "workload": workload,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "error_rate": round(len(errors) / requests, 4),
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 2),
+        "latency_ms": latency,
+        "sample_error": errors[0] if errors else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def benchmark(args):
+    corpus = load_corpus(args.languages, args.workloads)
+    if not corpus:
+        sys.exit("No programs match --languages/--workloads")
+    client = Client(args.url, args.timeout, args.token)
+    report = {
+        "backend": args.backend,
+        "url": args.url,
+        "commit": git_commit(),
+        "started_at": datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        "host": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version()},
+        "settings": {"requests": args.requests, "warmup": args.warmup, "concurrency": args.concurrency,
+                     "authenticated": bool(args.token)},
+        "results": [],
+    }
+
+    rate_limited = False
+    print(f"{'language':<11} {'workload':<8} {'conc':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>7} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for (language, workload), code in corpus.items():
+            result = run_case(client, language, workload, code, concurrency, args.requests, args.warmup)
+            report["results"].append(result)
+            latency = result["latency_ms"]
+            print(f"{language:<11} {workload:<8} {concurrency:>4} {latency['p50']:>8} {latency['p95']:>8} "
+                  f"{latency['p99']:>8} {result['throughput_rps']:>7} {result['error_rate']:>7.1%}")
+            if result["sample_error"]:
+                print(f"    e.g. {result['sample_error']}")
+                rate_limited = rate_limited or result['sample_error'].startswith('HTTP 429')
+
+    if rate_limited:
+        print("Runs were rate limited: pass --token for a pro or team account, "
+              "or run the server with ADMISSION_ENABLED=false")
+    output = args.output or f"bench-{args.backend}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+    print(f"Wrote {output}")
+
+
+def metric(result, name, group):
+    return result["latency_ms"][name] if group == 'latency' else result[name]
+
+
+def compare(before_path, after_path, threshold):
+    """Print per-case changes, returns the number of regressions beyond threshold percent"""
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    baseline = {(r["language"], r["workload"], r["concurrency"]): r for r in before["results"]}
+
+    print(f"{before['backend']} @ {(before.get('commit') or '?')[:8]} -> "
+          f"{after['backend']} @ {(after.get('commit') or '?')[:8]}")
+    regressions = 0
+    for result in after["results"]:
+        key = (result["language"], result["workload"], result["concurrency"])
+        old = baseline.get(key)
+        if old is None:
+            continue
+        changes = []
+        for name, group, direction in COMPARED:
+            was, now = metric(old, name, group), metric(result, name, group)
+            if name == 'error_rate':
+                worse = now > was
+                changes.append(f"{name} {was:.1%}->{now:.1%}")
+            else:
+                delta = (now - was) / was * 100 if was else 0.0
+                worse = delta * direction > threshold
+                changes.append(f"{name} {was}->{now} ({delta:+.0f}%)")
+            regressions += worse
+            if worse:
+                changes[-1] += " REGRESSION"
+        print(f"{key[0]:<11} {key[1]:<8} c={key[2]:<3} " + ", ".join(changes))
+    print(f"{regressions} regression(s) beyond {threshold}%")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default=os.getenv('BENCH_URL', 'http://localhost:5000'))
+    parser.add_argument('--backend', default='default', help='label for the server configuration under test')
+    parser.add_argument('-c', '--concurrency', default='1,8', type=lambda v: [int(c) for c in v.split(',')],
+                        help='comma separated concurrency levels (default: 1,8)')
+    parser.add_argument('-n', '--requests', type=int, default=50, help='requests per language/workload/level')
+    parser.add_argument('--warmup', type=int, default=2, help='unmeasured requests per case')
+    parser.add_argument('-l', '--languages', type=lambda v: v.split(','), help='comma separated (default: all)')
+    parser.add_argument('-w', '--workloads', type=lambda v: v.split(','),
+                        help=f"comma separated from {','.join(WORKLOADS)} (default: all)")
+    parser.add_argument('--token', default=os.getenv('BENCH_TOKEN'),
+                        help='JWT sent as a bearer token, so runs get the account\'s admission tier')
+    parser.add_argument('--timeout', type=float, default=60, help='per-request timeout in seconds')
+    parser.add_argument('-o', '--output', help='JSON report path (default: bench-<backend>-<time>.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two JSON reports')
+    parser.add_argument('--threshold', type=float, default=10, help='regression threshold in percent')
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare, args.threshold) else 0)
+    benchmark(args)
+
+
+if __name__ == '__main__':
+    main()
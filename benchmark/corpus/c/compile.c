@@ -0,0 +1,28 @@
+/* Lots of code for the compiler: 256 generated functions and a dispatch table */
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+#define F(n) \
+    static double f##n(double x) { \
+        double acc = 0; \
+        for (int i = 0; i < 8; i++) acc += (x * i + n) / (1 + i * x) - (x - i) * n / (3 + i); \
+        return acc; \
+    }
+#define F4(n) F(n##0) F(n##1) F(n##2) F(n##3)
+#define F16(n) F4(n##0) F4(n##1) F4(n##2) F4(n##3)
+#define F64(n) F16(n##0) F16(n##1) F16(n##2) F16(n##3)
+F64(1) F64(2) F64(3) F64(4)
+
+#define R(n) f##n,
+#define R4(n) R(n##0) R(n##1) R(n##2) R(n##3)
+#define R16(n) R4(n##0) R4(n##1) R4(n##2) R4(n##3)
+#define R64(n) R16(n##0) R16(n##1) R16(n##2) R16(n##3)
+static double (*table[])(double) = { R64(1) R64(2) R64(3) R64(4) };
+
+int main(void) {
+    double total = 0;
+    for (size_t i = 0; i < sizeof(table) / sizeof(table[0]); i++) total += table[i](0.5);
+    printf("%zu %.3f\n", sizeof(table) / sizeof(table[0]), total);
+    return 0;
+}
@@ -0,0 +1,19 @@
+#include <stdio.h>
+#include <stdlib.h>
+
+int main(void) {
+    const int limit = 20000000;
+    char *sieve = malloc(limit);
+    int count = 0;
+    for (int i = 0; i < limit; i++) sieve[i] = 1;
+    for (long i = 2; i * i < limit; i++) {
+        if (sieve[i]) for (long j = i * i; j < limit; j += i) sieve[j] = 0;
+    }
+    for (int i = 2; i < limit; i++) count += sieve[i];
+    free(sieve);
+
+    long total = 0;
+    for (long n = 0; n < 50000000; n++) total = (total + n * n) % 1000003;
+    printf("%d %ld\n", count, total);
+    return 0;
+}
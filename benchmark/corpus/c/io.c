@@ -0,0 +1,11 @@
+#include <stdio.h>
+
+int main(void) {
+    long value, total = 0, count = 0;
+    while (scanf("%ld", &value) == 1) {
+        total += value;
+        count++;
+    }
+    printf("%ld %ld\n", count, total);
+    return 0;
+}
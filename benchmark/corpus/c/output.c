@@ -0,0 +1,6 @@
+#include <stdio.h>
+
+int main(void) {
+    for (int i = 0; i < 25000; i++) printf("line %d: the quick brown fox\n", i);
+    return 0;
+}
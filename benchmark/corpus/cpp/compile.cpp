@@ -0,0 +1,53 @@
+// Template-heavy translation unit: the standard headers plus deep instantiation
+#include <algorithm>
+#include <iostream>
+#include <map>
+#include <numeric>
+#include <regex>
+#include <sstream>
+#include <string>
+#include <tuple>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+template <int N>
+struct Fib {
+    static constexpr long value = Fib<N - 1>::value + Fib<N - 2>::value;
+};
+template <>
+struct Fib<0> { static constexpr long value = 0; };
+template <>
+struct Fib<1> { static constexpr long value = 1; };
+
+template <int... Is>
+long sum_fibs(std::integer_sequence<int, Is...>) {
+    return (Fib<Is>::value + ...);
+}
+
+template <typename T>
+std::map<std::string, std::vector<T>> group(const std::vector<T>& items) {
+    std::map<std::string, std::vector<T>> groups;
+    for (const auto& item : items) {
+        std::ostringstream key;
+        key << item % 7;
+        groups[key.str()].push_back(item);
+    }
+    return groups;
+}
+
+int main() {
+    std::vector<long> values(1000);
+    std::iota(values.begin(), values.end(), 0);
+    auto groups = group(values);
+    std::unordered_map<std::string, std::tuple<long, double>> stats;
+    for (auto& [key, items] : groups) {
+        long total = std::accumulate(items.begin(), items.end(), 0L);
+        stats[key] = {total, static_cast<double>(total) / items.size()};
+    }
+    std::regex digits("[0-9]+");
+    std::string text = "run 42 of 1000";
+    auto matches = std::distance(std::sregex_iterator(text.begin(), text.end(), digits), std::sregex_iterator());
+    std::cout << sum_fibs(std::make_integer_sequence<int, 80>{}) << ' ' << stats.size() << ' ' << matches << '\n';
+    return 0;
+}
@@ -0,0 +1,17 @@
+#include <cstdio>
+#include <vector>
+
+int main() {
+    const int limit = 20000000;
+    std::vector<bool> sieve(limit, true);
+    int count = 0;
+    for (long i = 2; i * i < limit; i++) {
+        if (sieve[i]) for (long j = i * i; j < limit; j += i) sieve[j] = false;
+    }
+    for (int i = 2; i < limit; i++) count += sieve[i];
+
+    long total = 0;
+    for (long n = 0; n < 50000000; n++) total = (total + n * n) % 1000003;
+    std::printf("%d %ld\n", count, total);
+    return 0;
+}
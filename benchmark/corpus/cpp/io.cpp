@@ -0,0 +1,12 @@
+#include <iostream>
+
+int main() {
+    std::ios::sync_with_stdio(false);
+    long value, total = 0, count = 0;
+    while (std::cin >> value) {
+        total += value;
+        count++;
+    }
+    std::cout << count << ' ' << total << '\n';
+    return 0;
+}
@@ -0,0 +1,7 @@
+#include <iostream>
+
+int main() {
+    std::ios::sync_with_stdio(false);
+    for (int i = 0; i < 25000; i++) std::cout << "line " << i << ": the quick brown fox\n";
+    return 0;
+}
@@ -0,0 +1,51 @@
+import java.util.*;
+import java.util.function.*;
+import java.util.stream.*;
+
+// Generics, lambdas and streams keep javac busy with inference
+public class Main {
+    interface Shape { double area(); }
+    static class Circle implements Shape {
+        final double r;
+        Circle(double r) { this.r = r; }
+        public double area() { return Math.PI * r * r; }
+    }
+    static class Rect implements Shape {
+        final double w, h;
+        Rect(double w, double h) { this.w = w; this.h = h; }
+        public double area() { return w * h; }
+    }
+    static class Pair<A, B> {
+        final A first;
+        final B second;
+        Pair(A first, B second) { this.first = first; this.second = second; }
+        B second() { return second; }
+    }
+
+    static <T, K, V> Map<K, List<V>> groupMap(Collection<T> items, Function<T, K> key, Function<T, V> value) {
+        return items.stream().collect(Collectors.groupingBy(key, TreeMap::new, Collectors.mapping(value, Collectors.toList())));
+    }
+
+    static <T extends Comparable<T>> Optional<Pair<T, T>> range(List<T> items) {
+        return items.stream().reduce((a, b) -> a).map(first -> new Pair<>(
+            items.stream().min(Comparator.naturalOrder()).orElse(first),
+            items.stream().max(Comparator.naturalOrder()).orElse(first)));
+    }
+
+    public static void main(String[] args) {
+        List<Shape> shapes = IntStream.range(0, 1000)
+            .mapToObj(i -> i % 2 == 0 ? (Shape) new Circle(i % 10) : new Rect(i % 7, i % 5))
+            .collect(Collectors.toList());
+        Map<String, List<Double>> areas = groupMap(shapes, s -> s.getClass().getSimpleName(), Shape::area);
+        Map<String, DoubleSummaryStatistics> stats = areas.entrySet().stream().collect(Collectors.toMap(
+            Map.Entry::getKey,
+            e -> e.getValue().stream().mapToDouble(Double::doubleValue).summaryStatistics(),
+            (a, b) -> a,
+            LinkedHashMap::new));
+        BiFunction<Integer, Integer, Integer> add = Integer::sum;
+        Supplier<Stream<Integer>> numbers = () -> Stream.iterate(1, n -> n <= 100, n -> n + 1);
+        int total = numbers.get().reduce(0, add::apply);
+        Optional<Pair<Integer, Integer>> minMax = range(numbers.get().collect(Collectors.toList()));
+        System.out.println(stats.keySet() + " " + total + " " + minMax.map(Pair::second).orElse(0));
+    }
+}
@@ -0,0 +1,15 @@
+public class Main {
+    public static void main(String[] args) {
+        int limit = 20000000;
+        boolean[] composite = new boolean[limit];
+        int count = 0;
+        for (long i = 2; i * i < limit; i++) {
+            if (!composite[(int) i]) for (long j = i * i; j < limit; j += i) composite[(int) j] = true;
+        }
+        for (int i = 2; i < limit; i++) if (!composite[i]) count++;
+
+        long total = 0;
+        for (long n = 0; n < 50000000; n++) total = (total + n * n) % 1000003;
+        System.out.println(count + " " + total);
+    }
+}
@@ -0,0 +1,16 @@
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStreamReader;
+
+public class Main {
+    public static void main(String[] args) throws IOException {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+        long total = 0, count = 0;
+        for (String line = in.readLine(); line != null; line = in.readLine()) {
+            if (line.isEmpty()) continue;
+            total += Long.parseLong(line);
+            count++;
+        }
+        System.out.println(count + " " + total);
+    }
+}
@@ -0,0 +1,11 @@
+import java.io.BufferedWriter;
+import java.io.IOException;
+import java.io.OutputStreamWriter;
+
+public class Main {
+    public static void main(String[] args) throws IOException {
+        BufferedWriter out = new BufferedWriter(new OutputStreamWriter(System.out), 1 << 16);
+        for (int i = 0; i < 25000; i++) out.write("line " + i + ": the quick brown fox\n");
+        out.flush();
+    }
+}
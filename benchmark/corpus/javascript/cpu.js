@@ -0,0 +1,12 @@
+function countPrimes(limit) {
+  const sieve = new Uint8Array(limit).fill(1);
+  sieve[0] = sieve[1] = 0;
+  for (let i = 2; i * i < limit; i++) {
+    if (sieve[i]) for (let j = i * i; j < limit; j += i) sieve[j] = 0;
+  }
+  return sieve.reduce((a, b) => a + b, 0);
+}
+
+let total = 0;
+for (let n = 0; n < 3000000; n++) total = (total + n * n) % 1000003;
+console.log(countPrimes(5000000), total);
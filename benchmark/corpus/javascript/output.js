@@ -0,0 +1,3 @@
+const lines = [];
+for (let i = 0; i < 25000; i++) lines.push(`line ${i}: the quick brown fox`);
+process.stdout.write(lines.join('\n') + '\n');
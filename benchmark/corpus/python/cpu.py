@@ -0,0 +1,13 @@
+def count_primes(limit):
+    sieve = bytearray([1]) * limit
+    sieve[0:2] = b'\x00\x00'
+    for i in range(2, int(limit ** 0.5) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytearray(len(range(i * i, limit, i)))
+    return sum(sieve)
+
+
+total = 0
+for n in range(300000):
+    total = (total + n * n) % 1000003
+print(count_primes(2000000), total)
@@ -0,0 +1,8 @@
+import sys
+
+total = 0
+count = 0
+for line in sys.stdin:
+    total += int(line)
+    count += 1
+print(count, total)
@@ -0,0 +1,5 @@
+import sys
+
+out = sys.stdout
+for i in range(25000):
+    out.write(f"line {i}: the quick brown fox\n")
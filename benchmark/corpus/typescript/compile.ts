@@ -0,0 +1,32 @@
+// Type-level work for the checker: recursive conditional and mapped types
+type Digits = '0' | '1' | '2' | '3' | '4' | '5' | '6' | '7' | '8' | '9';
+type Pairs = `${Digits}${Digits}`;
+type Triples = `${Digits}${Pairs}`;
+
+type Tuple<N extends number, T extends unknown[] = []> = T['length'] extends N ? T : Tuple<N, [...T, unknown]>;
+type Add<A extends number, B extends number> = [...Tuple<A>, ...Tuple<B>]['length'];
+
+type DeepReadonly<T> = { readonly [K in keyof T]: T[K] extends object ? DeepReadonly<T[K]> : T[K] };
+type Paths<T, P extends string = ''> = {
+  [K in keyof T & string]: T[K] extends object ? Paths<T[K], `${P}${K}.`> | `${P}${K}` : `${P}${K}`
+}[keyof T & string];
+
+interface Config {
+  server: { host: string; port: number; tls: { cert: string; key: string; ciphers: string[] } };
+  database: { url: string; pool: { min: number; max: number; idle: number } };
+  languages: { python: { image: string; timeout: number }; java: { image: string; timeout: number } };
+}
+
+const config: DeepReadonly<Config> = {
+  server: { host: 'localhost', port: 5000, tls: { cert: 'a', key: 'b', ciphers: ['x'] } },
+  database: { url: 'postgres://', pool: { min: 1, max: 10, idle: 300 } },
+  languages: { python: { image: 'python', timeout: 10 }, java: { image: 'java', timeout: 10 } },
+};
+
+function get(path: Paths<Config>): unknown {
+  return path.split('.').reduce((value: any, key) => value[key], config);
+}
+
+const codes: Triples[] = ['000', '123', '999'];
+const sum: Add<40, 45> = 85;
+console.log(get('server.tls.cert'), get('database.pool.max'), codes.length, sum);
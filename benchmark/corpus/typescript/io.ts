@@ -0,0 +1,5 @@
+declare const require: any;
+const lines: string[] = require('fs').readFileSync(0, 'utf8').split('\n').filter(Boolean);
+let total = 0;
+for (const line of lines) total += Number(line);
+console.log(lines.length, total);
@@ -0,0 +1,4 @@
+declare const process: any;
+const lines: string[] = [];
+for (let i = 0; i < 25000; i++) lines.push(`line ${i}: the quick brown fox`);
+process.stdout.write(lines.join('\n') + '\n');
@@ -28,6 +28,8 @@ CREATE TABLE IF NOT EXISTS projects (
 CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects(user_id);
 CREATE INDEX IF NOT EXISTS idx_projects_share_id ON projects(share_id);
 CREATE INDEX IF NOT EXISTS idx_projects_created_at ON projects(created_at);
+-- Matches the keyset pagination of GET /api/projects (newest first)
+CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects(user_id, created_at DESC, id DESC);
 
 -- Update trigger for projects
 CREATE OR REPLACE FUNCTION update_updated_at_column()
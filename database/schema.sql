@@ -10,10 +10,14 @@ CREATE TABLE IF NOT EXISTS users (
     avatar_url TEXT,
     provider VARCHAR(50) DEFAULT 'email',
     is_admin BOOLEAN DEFAULT FALSE,
+    plan VARCHAR(20) NOT NULL DEFAULT 'free', -- pricing tier, sets execution rate limits
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Upgrade existing users tables to pricing tiers
+ALTER TABLE users ADD COLUMN IF NOT EXISTS plan VARCHAR(20) NOT NULL DEFAULT 'free';
+
 -- Projects table
 CREATE TABLE IF NOT EXISTS projects (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
@@ -23,26 +27,56 @@ CREATE TABLE IF NOT EXISTS projects (
     code TEXT NOT NULL,
     share_id VARCHAR(50) UNIQUE,
     is_public BOOLEAN DEFAULT FALSE,
+    version INTEGER NOT NULL DEFAULT 1, -- bumped on every save, see PATCH /api/projects/<id>
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Execution history table (for future use)
+-- Upgrade existing projects tables to versioned saves
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+-- Execution history table (per-run telemetry written by the backend)
 CREATE TABLE IF NOT EXISTS execution_history (
     id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
     user_id UUID REFERENCES users(id) ON DELETE CASCADE,
     project_id UUID REFERENCES projects(id) ON DELETE CASCADE,
     language VARCHAR(50) NOT NULL,
-    code TEXT NOT NULL,
+    code TEXT,
     input TEXT,
     output TEXT,
     error TEXT,
-    execution_time INTEGER, -- in milliseconds
+    status VARCHAR(20),
+    exit_code INTEGER,
+    execution_time INTEGER, -- in milliseconds, end to end
+    queue_wait_ms INTEGER,
+    container_start_ms INTEGER,
+    compile_ms INTEGER,
+    run_ms INTEGER,
+    teardown_ms INTEGER,
+    output_bytes INTEGER,
+    cache_hit BOOLEAN DEFAULT FALSE,
+    compile_cache_hit BOOLEAN DEFAULT FALSE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Upgrade existing execution_history tables to the telemetry columns
+ALTER TABLE execution_history ALTER COLUMN code DROP NOT NULL;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS status VARCHAR(20);
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS exit_code INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS queue_wait_ms INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS container_start_ms INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS compile_ms INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS run_ms INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS teardown_ms INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS output_bytes INTEGER;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS cache_hit BOOLEAN DEFAULT FALSE;
+ALTER TABLE execution_history ADD COLUMN IF NOT EXISTS compile_cache_hit BOOLEAN DEFAULT FALSE;
+
 -- Indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_projects_user_id ON projects(user_id);
 CREATE INDEX IF NOT EXISTS idx_projects_share_id ON projects(share_id);
+-- Matches the keyset pagination of GET /api/projects (newest first)
+CREATE INDEX IF NOT EXISTS idx_projects_user_created ON projects(user_id, created_at DESC, id DESC);
 CREATE INDEX IF NOT EXISTS idx_execution_history_user_id ON execution_history(user_id);
-CREATE INDEX IF NOT EXISTS idx_execution_history_project_id ON execution_history(project_id);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_execution_history_project_id ON execution_history(project_id);
+CREATE INDEX IF NOT EXISTS idx_execution_history_language_created ON execution_history(language, created_at);
\ No newline at end of file
@@ -0,0 +1,68 @@
+"""Build the pre-baked sandbox images and pin them in backend/runtime-images.json.
+
+    python docker/runtimes/build.py            # build locally, pin image IDs
+    python docker/runtimes/build.py --push     # push to the registry, pin repo digests
+
+Bump the -rN suffix of a tag (here and in LANGUAGE_CONFIG) whenever a
+Dockerfile changes, so compile caches keyed on the image start fresh.
+"""
+import argparse
+import json
+import os
+
+import docker
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LOCK_FILE = os.path.join(HERE, '..', '..', 'backend', 'runtime-images.json')
+
+# tag -> build context under docker/runtimes
+IMAGES = {
+    'rapidcompiler/python:3.9-r1': 'python',
+    'rapidcompiler/node:16-r2': 'node',
+    'rapidcompiler/gcc:12-r1': 'gcc',
+    'rapidcompiler/java:11-r2': 'java',
+}
+
+
+def build(client, tag, context, push=False):
+    print(f"Building {tag}...")
+    image, _ = client.images.build(path=os.path.join(HERE, context), tag=tag, pull=True, rm=True)
+    if not push:
+        return image.id
+    repository, _, version = tag.rpartition(':')
+    client.images.push(repository, version)
+    image.reload()
+    digests = [digest for digest in image.attrs.get('RepoDigests', []) if digest.startswith(repository + '@')]
+    if not digests:
+        raise RuntimeError(f"No registry digest for {tag} after push")
+    return digests[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--push', action='store_true', help='push images and pin registry digests')
+    parser.add_argument('--lock-file', default=LOCK_FILE)
+    parser.add_argument('only', nargs='*', help='tags to rebuild (default: all)')
+    args = parser.parse_args()
+
+    try:
+        with open(args.lock_file) as f:
+            lock = json.load(f)
+    except FileNotFoundError:
+        lock = {}
+
+    client = docker.from_env()
+    for tag, context in IMAGES.items():
+        if args.only and tag not in args.only:
+            continue
+        lock[tag] = build(client, tag, context, push=args.push)
+        print(f"  {tag} -> {lock[tag]}")
+
+    with open(args.lock_file, 'w') as f:
+        json.dump(lock, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"Wrote {os.path.normpath(args.lock_file)}")
+
+
+if __name__ == '__main__':
+    main()
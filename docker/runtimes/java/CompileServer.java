@@ -0,0 +1,118 @@
+import java.io.BufferedInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.IOException;
+import java.io.InputStream;
+import java.io.OutputStream;
+import java.io.StringWriter;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.Arrays;
+import java.util.Comparator;
+import java.util.stream.Stream;
+import javax.tools.JavaCompiler;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+/**
+ * Resident javac for the rapidcompiler backend (backend/compile_server.py).
+ *
+ * Request on stdin:   "<id> <length>\n" followed by length bytes of Main.java
+ * Response on stdout: "<id> ok|error <rss-bytes> <length>\n" followed by
+ *                     length bytes of diagnostics
+ *
+ * Classes are written to /tmp/build/<id>/classes, which the backend copies
+ * out as a tar streamed over an exec. The previous build directory is removed
+ * when the next request arrives. Annotation processing is disabled, so
+ * nothing from the submitted source ever runs in here.
+ */
+public class CompileServer {
+    private static final Path BUILD_ROOT = Paths.get("/tmp/build");
+
+    public static void main(String[] args) throws IOException {
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+        StandardJavaFileManager fileManager = compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        InputStream in = new BufferedInputStream(System.in);
+        OutputStream out = System.out;
+        Path previous = null;
+
+        String header;
+        while ((header = readLine(in)) != null) {
+            String[] parts = header.trim().split(" ");
+            String id = parts[0];
+            byte[] source = readFully(in, Integer.parseInt(parts[1]));
+
+            if (previous != null) {
+                deleteTree(previous);
+            }
+            Path dir = BUILD_ROOT.resolve(id);
+            Path classes = dir.resolve("classes");
+            Files.createDirectories(classes);
+            Path file = dir.resolve("Main.java");
+            Files.write(file, source);
+            previous = dir;
+
+            StringWriter diagnostics = new StringWriter();
+            boolean ok = compiler.getTask(
+                diagnostics, fileManager, null,
+                Arrays.asList("-proc:none", "-d", classes.toString()),
+                null, fileManager.getJavaFileObjects(file.toFile())
+            ).call();
+
+            byte[] body = diagnostics.toString().getBytes(StandardCharsets.UTF_8);
+            String reply = id + " " + (ok ? "ok" : "error") + " " + rss() + " " + body.length + "\n";
+            out.write(reply.getBytes(StandardCharsets.UTF_8));
+            out.write(body);
+            out.flush();
+        }
+    }
+
+    private static String readLine(InputStream in) throws IOException {
+        ByteArrayOutputStream line = new ByteArrayOutputStream();
+        int b;
+        while ((b = in.read()) != -1 && b != '\n') {
+            line.write(b);
+        }
+        if (b == -1 && line.size() == 0) {
+            return null;
+        }
+        return line.toString("UTF-8");
+    }
+
+    private static byte[] readFully(InputStream in, int length) throws IOException {
+        byte[] data = new byte[length];
+        int read = 0;
+        while (read < length) {
+            int n = in.read(data, read, length - read);
+            if (n == -1) {
+                throw new IOException("stdin closed mid-request");
+            }
+            read += n;
+        }
+        return data;
+    }
+
+    private static long rss() {
+        try {
+            for (String line : Files.readAllLines(Paths.get("/proc/self/status"))) {
+                if (line.startsWith("VmRSS:")) {
+                    return Long.parseLong(line.replaceAll("[^0-9]", "")) * 1024;
+                }
+            }
+        } catch (IOException | NumberFormatException e) {
+            // Fall through, memory growth is then judged by compile count only
+        }
+        return 0;
+    }
+
+    private static void deleteTree(Path root) throws IOException {
+        if (!Files.exists(root)) {
+            return;
+        }
+        try (Stream<Path> paths = Files.walk(root)) {
+            paths.sorted(Comparator.reverseOrder()).map(Path::toFile).forEach(File::delete);
+        }
+    }
+}
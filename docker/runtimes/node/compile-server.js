@@ -0,0 +1,73 @@
+// Resident tsc for the rapidcompiler backend (backend/compile_server.py).
+//
+// Request on stdin:   "<id> <length>\n" followed by length bytes of code.ts
+// Response on stdout: "<id> ok|error <rss-bytes> <length>\n" followed by
+//                     length bytes of diagnostics
+//
+// Output is emitted to /tmp/build/<id>/code.js, which the backend copies out
+// as a tar streamed over an exec. The previous build directory is removed when
+// the next request arrives. Parsed lib.*.d.ts files are kept between
+// compilations, which is where most of tsc's start-up time goes.
+const fs = require('fs');
+const path = require('path');
+const ts = require(path.join(process.env.TYPESCRIPT_PATH || '/usr/local/lib/node_modules', 'typescript'));
+
+const BUILD_ROOT = '/tmp/build';
+// Same options as a bare `tsc code.ts`
+const options = {};
+const host = ts.createCompilerHost(options);
+const libSourceFiles = new Map();
+const readSourceFile = host.getSourceFile.bind(host);
+host.getSourceFile = (fileName, languageVersion, onError, shouldCreate) => {
+  if (fileName.startsWith(BUILD_ROOT)) {
+    return readSourceFile(fileName, languageVersion, onError, shouldCreate);
+  }
+  if (!libSourceFiles.has(fileName)) {
+    libSourceFiles.set(fileName, readSourceFile(fileName, languageVersion, onError, shouldCreate));
+  }
+  return libSourceFiles.get(fileName);
+};
+const formatHost = {
+  getCanonicalFileName: (fileName) => fileName,
+  getCurrentDirectory: () => BUILD_ROOT,
+  getNewLine: () => '\n'
+};
+
+let previous = null;
+
+function compile(id, source) {
+  if (previous) {
+    fs.rmSync(previous, { recursive: true, force: true });
+  }
+  const dir = path.join(BUILD_ROOT, id);
+  fs.mkdirSync(dir, { recursive: true });
+  const file = path.join(dir, 'code.ts');
+  fs.writeFileSync(file, source);
+  previous = dir;
+
+  const program = ts.createProgram([file], options, host);
+  const emitted = program.emit();
+  const diagnostics = ts.getPreEmitDiagnostics(program).concat(emitted.diagnostics);
+  const ok = !diagnostics.some((d) => d.category === ts.DiagnosticCategory.Error);
+  return { ok, text: ts.formatDiagnostics(diagnostics, formatHost) };
+}
+
+let pending = Buffer.alloc(0);
+
+process.stdin.on('data', (chunk) => {
+  pending = Buffer.concat([pending, chunk]);
+  for (;;) {
+    const newline = pending.indexOf(10);
+    if (newline === -1) return;
+    const [id, length] = pending.subarray(0, newline).toString('utf8').trim().split(' ');
+    const end = newline + 1 + Number(length);
+    if (pending.length < end) return;
+    const source = pending.subarray(newline + 1, end);
+    pending = pending.subarray(end);
+
+    const { ok, text } = compile(id, source);
+    const body = Buffer.from(text, 'utf8');
+    process.stdout.write(`${id} ${ok ? 'ok' : 'error'} ${process.memoryUsage().rss} ${body.length}\n`);
+    process.stdout.write(body);
+  }
+});
@@ -634,7 +634,7 @@ const CodeEditor = ({ darkMode }) => {
       const data = await response.json();
       
       if (data.error) {
-        setOutput(`Error: ${data.error}`);
+        setOutput(data.truncated ? `${data.output}\n\nError: ${data.error}` : `Error: ${data.error}`);
         setWebPreview('');
       } else {
         setOutput(data.output || 'Program executed successfully (no output)');
@@ -57,7 +57,7 @@ const SharedProject = ({ darkMode }) => {
       const data = await response.json();
       
       if (data.error) {
-        setOutput(`Error: ${data.error}`);
+        setOutput(data.truncated ? `${data.output}\n\nError: ${data.error}` : `Error: ${data.error}`);
       } else {
         setOutput(data.output || 'Program executed successfully (no output)');
       }